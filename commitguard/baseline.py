@@ -0,0 +1,108 @@
+import hashlib
+import json
+import math
+import re
+from typing import Iterable, List
+
+from .logging_config import get_logger
+
+log = get_logger(__name__)
+
+BASELINE_VERSION = 1
+DEFAULT_BASELINE_FILE = ".commitguard-baseline.json"
+
+
+def normalize_secret(secret: str) -> str:
+    return re.sub(r"\s+", "", secret).strip("'\"`")
+
+
+def fingerprint(rule: str, secret: str, path: str | None = None) -> str:
+    data = "\0".join([rule, normalize_secret(secret), path or ""])
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    """Fixed size Bloom filter over sha256 hex fingerprints (no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6):
+        capacity = max(1, capacity)
+        self.__size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hashes = max(1, round(self.__size / capacity * math.log(2)))
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def __positions(self, fp: str):
+        # the fingerprint already is a uniform hash, double hashing over its two halves
+        h1 = int(fp[:16], 16)
+        h2 = int(fp[16:32], 16) | 1
+        for i in range(self.__hashes):
+            yield (h1 + i * h2) % self.__size
+
+    def add(self, fp: str):
+        for pos in self.__positions(fp):
+            self.__bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fp: str) -> bool:
+        return all(self.__bits[pos >> 3] & (1 << (pos & 7)) for pos in self.__positions(fp))
+
+
+class Baseline:
+    """Fingerprints of accepted / false positive findings, suppressed right after scanning."""
+
+    BLOOM_THRESHOLD = 100_000
+
+    def __init__(self, fingerprints: Iterable[str]):
+        fingerprints = list(fingerprints)
+        self.size = len(fingerprints)
+
+        if self.size > self.BLOOM_THRESHOLD:
+            log.info(f"Baseline has {self.size} fingerprints, using a Bloom filter")
+            self.__index = BloomFilter(self.size)
+            for fp in fingerprints:
+                self.__index.add(fp)
+        else:
+            self.__index = set(fingerprints)
+
+    @classmethod
+    def load(cls, filename: str) -> "Baseline":
+        with open(filename, encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != BASELINE_VERSION:
+            raise ValueError(f"Unsupported baseline version {data.get('version')} in {filename}")
+
+        baseline = cls(data.get("fingerprints", []))
+        log.info(f"Loaded baseline {filename} ({baseline.size} fingerprint(s))")
+        return baseline
+
+    @staticmethod
+    def save(filename: str, fingerprints: Iterable[str]):
+        data = {"version": BASELINE_VERSION, "fingerprints": sorted(set(fingerprints))}
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        log.info(f"Baseline with {len(data['fingerprints'])} fingerprint(s) saved to {filename}")
+
+    def __contains__(self, fp: str) -> bool:
+        return fp in self.__index
+
+    def suppresses(self, rule: str, secret: str, path: str | None = None) -> bool:
+        # entries are either global for the secret or scoped to one path
+        if fingerprint(rule, secret) in self:
+            return True
+        return path is not None and fingerprint(rule, secret, path) in self
+
+
+def record_path(location: str) -> str:
+    return location.rsplit(":", 1)[0]
+
+
+def fingerprints_for(records: List[dict], explain, with_paths: bool = False) -> List[str]:
+
+    result: List[str] = []
+    for record in records:
+        hit = explain(record["line"])
+        if hit is None:
+            continue
+        path = record_path(record["location"]) if with_paths else None
+        result.append(fingerprint(hit["rule"], hit["match"], path))
+
+    return result
@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Small thread-safe LRU map, shared by jobs/workers of one process."""
+
+    def __init__(self, max_size: int = 1024):
+        self.__max_size = max_size
+        self.__data: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lock:
+            if key not in self.__data:
+                self.misses += 1
+                return default
+            self.__data.move_to_end(key)
+            self.hits += 1
+            return self.__data[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+            if len(self.__data) > self.__max_size:
+                self.__data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            return key in self.__data
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__data)
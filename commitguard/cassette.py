@@ -0,0 +1,211 @@
+import atexit
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .logging_config import get_logger
+
+log = get_logger(__name__)
+
+CASSETTE_VERSION = 1
+RECORD = "record"
+REPLAY = "replay"
+
+# headers that describe the wire format, the cassette stores the decoded body
+HOP_HEADERS = {"content-encoding", "transfer-encoding", "connection", "keep-alive"}
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Replay asked for a request that was never recorded."""
+
+
+class Cassette:
+    """Recorded GitHub API responses and LLM verdicts, replayed in recording order for deterministic offline runs."""
+
+    def __init__(self, filename: str, mode: str = REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected {RECORD!r} or {REPLAY!r}")
+
+        self.filename = filename
+        self.mode = mode
+        self.__entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.__cursors: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+        if mode == REPLAY:
+            with open(filename, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {data.get('version')} in {filename}")
+            self.__entries = data.get("entries", {})
+            log.info(f"Replaying cassette {filename} ({len(self.__entries)} recorded request(s))")
+
+    #region PUBLIC methods
+    @staticmethod
+    def request_key(method: str, url: str, accept: str | None = None) -> str:
+        # host-less and with sorted query, a recording does not depend on GITHUB_API_URL or parameter order
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query)))
+        return f"{method.upper()} {parts.path}{'?' + query if query else ''} [{accept or ''}]"
+
+    def record(self, key: str, entry: Dict[str, Any]):
+        with self.__lock:
+            self.__entries.setdefault(key, []).append(entry)
+
+    def replay(self, key: str) -> Dict[str, Any]:
+        with self.__lock:
+            entries = self.__entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for {key} in {self.filename}")
+
+            # repeated requests get the recordings in order, the last one is served from then on
+            cursor = self.__cursors.get(key, 0)
+            self.__cursors[key] = cursor + 1
+            return entries[min(cursor, len(entries) - 1)]
+
+    def save(self):
+        if self.mode != RECORD:
+            return
+
+        with self.__lock:
+            data = {"version": CASSETTE_VERSION, "entries": self.__entries}
+            tmp = f"{self.filename}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, ensure_ascii=False)
+            os.replace(tmp, self.filename)
+
+        log.info(f"Cassette {self.filename} saved ({len(data['entries'])} request(s))")
+
+    def wrap_llm(self, classify=None):
+        """LLM callable that records (or replays) one verdict per input line, so replays do not depend on how
+        the lines were batched."""
+
+        def cassette_classify(texts: List[str]) -> str:
+            nonlocal classify
+
+            if self.mode == REPLAY:
+                return "\n".join(self.replay(self.llm_key(text))["verdict"] for text in texts)
+
+            if classify is None:
+                from .llm import run_llm as classify
+            from .core import match_verdicts
+
+            response = classify(texts)
+            for text, verdict in match_verdicts(texts, response).items():
+                self.record(self.llm_key(text), {"verdict": verdict})
+            return response
+
+        return cassette_classify
+
+    @staticmethod
+    def llm_key(text: str) -> str:
+        return f"LLM {hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+    #endregion
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport adapter that records real responses into a cassette, or serves them from it without network."""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        key = Cassette.request_key(request.method, request.url, request.headers.get("Accept"))
+
+        if self.cassette.mode == REPLAY:
+            return self.__build_response(request, self.cassette.replay(key))
+
+        resp = super().send(request, **kwargs)
+        body = resp.content
+        entry: Dict[str, Any] = {
+            "status": resp.status_code,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in HOP_HEADERS},
+        }
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_hex"] = body.hex()
+        entry["headers"]["Content-Length"] = str(len(body))
+
+        self.cassette.record(key, entry)
+        return resp
+
+    def __build_response(self, request: requests.PreparedRequest, entry: Dict[str, Any]) -> requests.Response:
+        body = entry["body"].encode("utf-8") if "body" in entry else bytes.fromhex(entry.get("body_hex", ""))
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.reason = HTTPStatus(entry["status"]).phrase
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.raw = io.BytesIO(body)
+        # the body is already in memory, streamed reads (iter_content / iter_lines) are served from it
+        resp._content = body
+        resp._content_consumed = True
+        return resp
+
+
+class StubLLM:
+    """Deterministic stand-in for the LLM chain, answers in the format of llm.run_llm without network or API key."""
+
+    def __init__(self, level: str = "MEDIUM", latency: float = 0.0):
+        self.level = level
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, texts: List[str]) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        lines = [f"{self.level}: stubbed verdict - {text.strip()}" for text in texts if text.strip()]
+        return "\n".join(lines) if lines else "ok"
+
+
+_active_cassette: Cassette | None = None
+_cassette_lock = threading.Lock()
+
+
+def cassette_from_env() -> Cassette | None:
+    """COMMITGUARD_CASSETTE=<file> with COMMITGUARD_CASSETTE_MODE=record|replay (default replay).
+    One cassette per process, shared by every client and the LLM."""
+    global _active_cassette
+
+    filename = os.environ.get("COMMITGUARD_CASSETTE")
+    if not filename:
+        return None
+
+    mode = os.environ.get("COMMITGUARD_CASSETTE_MODE", REPLAY).lower()
+    with _cassette_lock:
+        if _active_cassette is None or (_active_cassette.filename, _active_cassette.mode) != (filename, mode):
+            _active_cassette = Cassette(filename, mode)
+            if _active_cassette.mode == RECORD:
+                atexit.register(_active_cassette.save)
+        return _active_cassette
+
+
+def llm_from_env():
+    """LLM callable for the run: COMMITGUARD_LLM=stub for the stub, recorded / replayed when a cassette is set.
+    None means the real chain, imported on first use."""
+
+    classify = StubLLM() if os.environ.get("COMMITGUARD_LLM", "").lower() == "stub" else None
+
+    cassette = cassette_from_env()
+    if cassette is None:
+        return classify
+    return cassette.wrap_llm(classify)
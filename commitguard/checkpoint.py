@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from .logging_config import get_logger
+
+log = get_logger(__name__)
+
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 30.0
+
+
+class Checkpoint:
+    """Progress of a long scan on disk: scanned commits per repository with their findings, and the verdicts
+    assigned so far. Findings without a verdict are the LLM batches still pending and are classified again
+    on resume. Commits fetched but not scanned yet are simply fetched again.
+
+    The scan pipeline updates it from the event loop only and it keeps its own copies of the findings,
+    so a save never races with a classifier thread writing verdicts."""
+
+    def __init__(self, filename: str, interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        self.filename = filename
+        self.interval = interval
+        self.__repos: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        # id of a finding held by the pipeline -> the copy kept here (the pipeline keeps its findings alive until the run ends)
+        self.__copies: Dict[int, Dict[str, Any]] = {}
+        self.__last_save = time.monotonic()
+        self.__dirty = False
+
+    #region PUBLIC methods
+    @classmethod
+    def load(cls, filename: str, interval: float = DEFAULT_CHECKPOINT_INTERVAL) -> "Checkpoint":
+        checkpoint = cls(filename, interval)
+
+        with open(filename, encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {data.get('version')} in {filename}")
+
+        checkpoint.__repos = data.get("repos", {})
+        commits = sum(len(scanned) for scanned in checkpoint.__repos.values())
+        log.info(f"Resuming from checkpoint {filename} ({commits} scanned commit(s), {len(checkpoint.pending())} pending finding(s))")
+        return checkpoint
+
+    def is_scanned(self, repo: str, commit_hash: str) -> bool:
+        return commit_hash in self.__repos.get(repo, {})
+
+    def findings(self, repo: str, commit_hash: str) -> List[Dict[str, Any]]:
+        records = []
+        for stored in self.__repos[repo][commit_hash]:
+            record = dict(stored)
+            self.__copies[id(record)] = stored
+            records.append(record)
+        return records
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return [r for scanned in self.__repos.values() for records in scanned.values() for r in records if "llm_response" not in r]
+
+    def mark_scanned(self, repo: str, commit_hash: str, records: List[Dict[str, Any]]):
+        copies = []
+        for record in records:
+            copy = dict(record)
+            self.__copies[id(record)] = copy
+            copies.append(copy)
+
+        self.__repos.setdefault(repo, {})[commit_hash] = copies
+        self.__dirty = True
+        self.save_if_due()
+
+    def mark_classified(self, records: List[Dict[str, Any]]):
+        for record in records:
+            copy = self.__copies.get(id(record))
+            if copy is None:
+                continue
+            for key in ("llm_response", "triage"):
+                if key in record:
+                    copy[key] = record[key]
+
+        self.__dirty = True
+        self.save_if_due()
+
+    def save_if_due(self):
+        if self.__dirty and time.monotonic() - self.__last_save >= self.interval:
+            self.save()
+
+    def save(self):
+        data = {"version": CHECKPOINT_VERSION, "repos": self.__repos}
+
+        # written next to the target and renamed, a crash mid-write leaves the previous checkpoint intact
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.filename)
+
+        self.__last_save = time.monotonic()
+        self.__dirty = False
+        log.debug("Checkpoint saved to %s", self.filename)
+    #endregion
@@ -1,67 +1,80 @@
 import argparse
 import asyncio
-from .leaks_parser import LeaksParser
-from .githubclient import GitHubClient
-from typing import List, Dict, Any
-from .llm import run_llm
-from .logging_config import get_logger
+from .leaks_parser import LeaksParser, ScanBudget
+from .githubclient import GitHubClient, GITHUB_API_URL
+from .cache import LRUCache
+from .pr_reporter import PRReporter
+from .triage import TriageScorer
+from .cassette import llm_from_env
+from .checkpoint import Checkpoint, DEFAULT_CHECKPOINT_INTERVAL
+from .preprocess import is_notebook, notebook_cell_map
+from .baseline import Baseline, DEFAULT_BASELINE_FILE, fingerprints_for, record_path
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
+from .logging_config import bind_log_context, debug_enabled, get_logger
 from collections import Counter
-import os, json, urllib.request, urllib.error
+import os, sys, json, threading, uuid
+import requests
 
-log = get_logger(__name__)
+if TYPE_CHECKING:
+    from .pipeline import ScanPipeline
 
+log = get_logger(__name__)
 
-def write_pr_msg(msg: str = ""):
-    if os.getenv("GITHUB_ACTIONS") != "true":
-        log.info("PR: LOCAL RUN. Exiting..")
-        return
+# verdict of a line the LLM did not answer for, kept visible instead of being cleared as OK
+UNCLASSIFIED_VERDICT = "MEDIUM: not classified by LLM"
 
-    try:
-        repo = os.environ["REPO"]
-        pr = os.environ["PR_NUMBER"]
-        token = os.environ["GITHUB_TOKEN"]
-        run_id = os.environ["GITHUB_RUN_ID"]
-    except KeyError as e:
-        raise RuntimeError(f"Missing required CI env var: {e}") from e
 
+def write_pr_msg(msg: str = "", findings: List[Dict[str, Any]] | None = None, session: requests.Session | None = None,
+                 repo: str | None = None, pr: str | int | None = None, token: str | None = None,
+                 head_sha: str | None = None, api_url: str = GITHUB_API_URL):
+    footer = ""
 
-    run_url = f"https://github.com/{repo}/actions/runs/{run_id}"
+    if repo is None:
+        if os.getenv("GITHUB_ACTIONS") != "true":
+            log.info("PR: LOCAL RUN. Exiting..")
+            return
 
+        try:
+            repo = os.environ["REPO"]
+            pr = os.environ["PR_NUMBER"]
+            token = os.environ["GITHUB_TOKEN"]
+            run_id = os.environ["GITHUB_RUN_ID"]
+        except KeyError as e:
+            raise RuntimeError(f"Missing required CI env var: {e}") from e
 
-    body = "\n".join([
-        "📎 **Full analysis report:** available in workflow artifacts → `commitguard-report`",
-        "",
-        f"- View JSON report: {run_url}",
-        "",
-        "- Workflow artifacts: `commitguard-report`"
-        "",
-        "⚠️ **Recommendation:** review **High** and **Medium** findings before merging this PR."
-    ])
+        head_sha = head_sha or os.getenv("HEAD_SHA")
+        run_url = f"https://github.com/{repo}/actions/runs/{run_id}"
 
-    url = f"https://api.github.com/repos/{repo}/issues/{pr}/comments"
 
-    pr_msg = "Leaks parser did not find anything suspicious. Exiting..." if not msg else "\n".join([msg.rstrip(), "", body])
+        footer = "\n".join([
+            "📎 **Full analysis report:** available in workflow artifacts → `commitguard-report`",
+            "",
+            f"- View JSON report: {run_url}",
+            "",
+            "- Workflow artifacts: `commitguard-report`"
+            "",
+            "⚠️ **Recommendation:** review **High** and **Medium** findings before merging this PR."
+        ])
 
-    data = json.dumps({"body": pr_msg}).encode("utf-8")
+    pr_msg = "Leaks parser did not find anything suspicious. Exiting..." if not msg else "\n".join([msg.rstrip(), "", footer]).rstrip()
 
-    req = urllib.request.Request(
-        url, data=data, method="POST",
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-            "Content-Type": "application/json",
-            "User-Agent": "ci-external-scripts"
-        }
-    )
+    reporter = PRReporter(session or requests.Session(), repo, pr, token, api_url)
 
     try:
-        with urllib.request.urlopen(req) as r:
-            log.info("Status:", r.status)
-            log.info("Comment posted.") if r.status == 201 else print("Unexpected response.")
-    except urllib.error.HTTPError as e:
-        log.error("API error:", e.code, e.read().decode())
+        reporter.upsert_comment(pr_msg)
+    except requests.RequestException as e:
+        log.error(f"API error while writing PR comment: {e}")
         raise SystemExit(1)
 
+    if not head_sha:
+        return
+
+    try:
+        reporter.publish_check_run(head_sha, findings or [], pr_msg)
+    except requests.RequestException as e:
+        # check runs need the 'checks: write' permission, the comment alone is still a valid report
+        log.warning(f"Check run was not published: {e}")
+
 
 def save_results_to_file(suspicious_commits, filename="suspicious_commits.json"):
     try:
@@ -72,107 +85,209 @@ def save_results_to_file(suspicious_commits, filename="suspicious_commits.json")
         log.error(f"Failed to save results: {e}")
 
 
-def main():
-    parser = argparse.ArgumentParser(prog="commitguard", description="Scan github repository for commits (searching for some leaks / weak / insecure places)")
-    parser.add_argument("--repo", required=True, help="URL GitHub-repo (HTTPS or SSH)")
-    parser.add_argument("--n", required=True, help="Amount of commits to fetch [1, 100]")
+def collect_suspicious(leaksparser: LeaksParser, diffs: List[Tuple[str, str, str]], c_details: Dict[str, Any], commit_hash: str,
+                       baseline: Baseline | None = None, budget: ScanBudget | None = None) -> List[Dict[str, Any]]:
+
+    codes = [c for c, _, _ in diffs]
+    suspicious_for_commit = leaksparser.run_scanner(codes, budget)
+
+    records: List[Dict[str, Any]] = []
+    for s_commit in suspicious_for_commit:
+        hit = leaksparser.explain(s_commit)
+        for code, loc, side in diffs:
+            if code == s_commit:
+                if baseline is not None and hit and baseline.suppresses(hit["rule"], hit["match"], record_path(loc)):
+                    log.debug("%s: %s finding is in baseline, suppressed", loc, hit["rule"])
+                    continue
+                record = {
+                    "line": s_commit,
+                    "location": loc,
+                    "side": side,
+                    "rule": hit["rule"] if hit else None,
+                    "entropy": hit["entropy"] if hit else None,
+                    "context": hit["context"] if hit else [],
+                    "author": c_details["author"],
+                    "date": c_details["date"],
+                    "commit_message": c_details["commit_message"],
+                    "commit_sha": c_details.get("sha") or commit_hash,
+                }
+                records.append(record)
+
+    return records
+
+
+def annotate_notebook_cells(ghc: GitHubClient, commit_hash: str, filename: str, records: List[Dict[str, Any]]):
+
+    # deleted lines point into the parent version of the notebook, only the new version is mapped
+    targets = [r for r in records if r["side"] == "added"]
+    if not targets:
+        return
 
-    parser.add_argument(
-        "--out",
-        default="suspicious_commits.json",
-        help="Output json file name (default: suspicious_commits.json)"
-    )
+    raw_lines = (item["code"] for chunk in ghc.iter_file_chunks(commit_hash, filename, preprocess=False) for item in chunk)
+    cell_map = notebook_cell_map(raw_lines)
 
-    parser.add_argument(
-        "--nofile",
-        action="store_true",
-        help="Do not save output to file"
-    )
-    args = parser.parse_args()
-    ghc = GitHubClient(args.repo)
+    for record in targets:
+        line_number = record["location"].rsplit(":", 1)[-1]
+        if line_number.isdigit() and int(line_number) in cell_map:
+            cell, line = cell_map[int(line_number)]
+            record["notebook_cell"] = {"cell": cell, "line": line}
 
-    ghc.authorize_github_api()
 
+def scan_commit(ghc: GitHubClient, leaksparser: LeaksParser, commit_hash: str, c_details: Dict[str, Any],
+                baseline: Baseline | None = None) -> List[Dict[str, Any]]:
 
-    async def conc_part():
-        commit_data = await ghc.run_fetching_async(int(args.n), 10)
-        return commit_data
+    suspicious_commits: List[Dict[str, Any]] = []
 
+    files: Dict[str, List[Tuple[str, str, str]]] = {}
+    for section, side in (("additions", "added"), ("deletions", "deleted")):
+        for item in c_details[section]:
+            files.setdefault(record_path(item["location"]), []).append((item["code"], item["location"], side))
 
-    c_data = asyncio.run(conc_part())
-    leaksparser = LeaksParser()
+    # every file gets its own scan budget, one huge file must not stall the whole commit
+    for filename, diffs in files.items():
+        budget = ScanBudget(leaksparser.MAX_FILE_SCAN_CHARS)
+        records = collect_suspicious(leaksparser, diffs, c_details, commit_hash, baseline, budget)
+        if records and is_notebook(filename):
+            annotate_notebook_cells(ghc, commit_hash, filename, records)
+        suspicious_commits.extend(records)
+
+    for filename in c_details["truncated_files"]:
+        log.info(f"{filename}: patch omitted by GitHub, scanning file contents in chunks")
+        budget = ScanBudget(leaksparser.MAX_FILE_SCAN_CHARS)
+        records = []
+        for chunk in ghc.iter_file_chunks(commit_hash, filename):
+            diffs = [(item["code"], item["location"], "added") for item in chunk]
+            records.extend(collect_suspicious(leaksparser, diffs, c_details, commit_hash, baseline, budget))
+        if records and is_notebook(filename):
+            annotate_notebook_cells(ghc, commit_hash, filename, records)
+        suspicious_commits.extend(records)
+
+    return suspicious_commits
 
-    suspicious_commits: List[Dict[str, Any]] = []
 
-    for commit_hash, details in c_data.items():
+def scan_commits(ghc: GitHubClient, leaksparser: LeaksParser, c_data: Dict[str, Dict],
+                 baseline: Baseline | None = None) -> List[Dict[str, Any]]:
+
+    suspicious_commits: List[Dict[str, Any]] = []
 
+    for commit_hash in c_data:
         c_details = ghc.get_commit_details(commit_hash)
+        suspicious_commits.extend(scan_commit(ghc, leaksparser, commit_hash, c_details, baseline))
 
-        diffs = [
-            (item["code"], item["location"])
-            for section in ("additions", "deletions")
-            for item in c_details[section]
-        ]
-
-        codes = [c for c, _ in diffs]
-        suspicious_for_commit = leaksparser.run_scanner(codes)
-
-        for s_commit in suspicious_for_commit:
-            for code, loc in diffs:
-                if code == s_commit:
-                    record = {
-                        "line": s_commit,
-                        "location": loc,
-                        "author": c_details["author"],
-                        "date": c_details["date"],
-                        "commit_message": c_details["commit_message"],
-                        "commit_sha": c_details.get("sha") or commit_hash,
-                    }
-                    suspicious_commits.append(record)
+    return suspicious_commits
 
-    if not suspicious_commits:
-        log.info("Leaks parser did not find anything suspicious. Exiting...")
-        write_pr_msg()
-        return None
 
-    log.info(f"Leaks parser found {len(suspicious_commits)} suspicious line(s), sending to LLM for analysis")
+def read_repos_file(filename: str) -> List[str]:
 
-    suspicious_texts: List[str] = [r["line"] for r in suspicious_commits]
+    repos: List[str] = []
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                repos.append(line)
+
+    return repos
+
+
+def response_level(line: str):
+    if line.upper().startswith("HIGH"):
+        return "HIGH"
+    elif line.upper().startswith("MEDIUM"):
+        return "MEDIUM"
+    elif line.upper().startswith("LOW"):
+        return "LOW"
+    elif line.lower().startswith("ok"):
+        return "OK"
+    return None
+
+
+def match_verdicts(texts: List[str], response: str) -> Dict[str, str]:
 
-    response = run_llm(suspicious_texts)
     lines = [l.strip() for l in response.splitlines() if l.strip()]
-    levels = []
 
-    for line in lines:
-        if line.upper().startswith("HIGH"):
-            levels.append("HIGH")
-        elif line.upper().startswith("MEDIUM"):
-            levels.append("MEDIUM")
-        elif line.upper().startswith("LOW"):
-            levels.append("LOW")
-        elif line.lower().startswith("ok"):
-            levels.append("OK")
+    if debug_enabled(log):
+        for line in lines:
+            log.debug("LLM: %s", line)
+
+    verdicts: Dict[str, str] = {}
+    for text in texts:
+        needle = text.strip()
+        for line in lines:
+            # "<LEVEL>: <message> - <evidence>", evidence is a snippet of the input line
+            evidence = line.rsplit(" - ", 1)[1].strip() if " - " in line else ""
+            if needle and (needle in line or (evidence and evidence in text)):
+                verdicts[text] = line
+                break
+        else:
+            # the LLM answers for every line, a missing one is format drift or a cut off answer, not a cleared line
+            verdicts[text] = UNCLASSIFIED_VERDICT
 
-    for line in lines:
-        log.debug(f"LLM: {line}")
+    unclassified = sum(1 for verdict in verdicts.values() if verdict == UNCLASSIFIED_VERDICT)
+    if unclassified:
+        log.warning(f"LLM: no verdict for {unclassified} of {len(texts)} line(s), reported as {UNCLASSIFIED_VERDICT!r}")
+    return verdicts
 
-    stats = Counter(levels)
+
+def assign_verdicts(findings: List[Dict[str, Any]], classify=None, verdict_cache: LRUCache | None = None,
+                    scorer: TriageScorer | None = None):
+
+    undecided = findings
+    if scorer is not None:
+        _, undecided = scorer.triage(findings)
+
+    pending: List[Dict[str, Any]] = []
+    for item in undecided:
+        cached = verdict_cache.get(item["line"]) if verdict_cache is not None else None
+        if cached is not None:
+            item["llm_response"] = cached
+        else:
+            pending.append(item)
+
+    texts = list(dict.fromkeys(item["line"] for item in pending))
+    if not texts:
+        return
+
+    if classify is None:
+        # imported on demand: langchain is slow to import and needs OPENAI_API_KEY
+        from .llm import run_llm as classify
+
+    log.info(f"LLM: classifying {len(texts)} unique line(s), {len(undecided) - len(pending)} served from cache")
+    verdicts = match_verdicts(texts, classify(texts))
+
+    for item in pending:
+        item["llm_response"] = verdicts[item["line"]]
+
+    if verdict_cache is not None:
+        for text, verdict in verdicts.items():
+            # a line the LLM skipped is asked again the next time it shows up
+            if verdict != UNCLASSIFIED_VERDICT:
+                verdict_cache.put(text, verdict)
+
+
+def severity_stats(suspicious_commits: List[Dict[str, Any]]) -> Counter:
+
+    levels = [response_level(item["llm_response"]) for item in suspicious_commits]
+    stats = Counter(level for level in levels if level)
 
     log.info(
-        f"LLM summary: "
+        f"Severity summary: "
         f"{stats.get('HIGH', 0)} HIGH, "
         f"{stats.get('MEDIUM', 0)} MEDIUM, "
         f"{stats.get('LOW', 0)} LOW, "
         f"{stats.get('OK', 0)} OK"
     )
-    for result in response:
-        for item in suspicious_commits:
-            if item["line"] in result:
-                item["llm_response"] = result
-                break
 
-    if args.nofile == False:
-        save_results_to_file(suspicious_commits, args.out)
+    return stats
+
+
+def classify_findings(suspicious_commits: List[Dict[str, Any]], classify=None, verdict_cache: LRUCache | None = None,
+                      scorer: TriageScorer | None = None) -> Counter:
+
+    assign_verdicts(suspicious_commits, classify, verdict_cache, scorer)
+    return severity_stats(suspicious_commits)
+
+
+def build_summary(suspicious_commits: List[Dict[str, Any]], stats: Counter) -> str:
 
     order = ["HIGH", "MEDIUM", "LOW", "OK"]
 
@@ -202,8 +317,14 @@ def main():
 
         lines.append(f"| {icon} {level.capitalize()} | {count} |")
 
+    triaged = sum(1 for item in suspicious_commits if "triage" in item)
+
     lines.append("")
-    lines.append("All suspicious lines were forwarded to the LLM for further analysis (via LangChain).")
+    if triaged:
+        lines.append(f"{triaged} line(s) were classified locally with high confidence, "
+                     f"the remaining {len(suspicious_commits) - triaged} were forwarded to the LLM for further analysis (via LangChain).")
+    else:
+        lines.append("All suspicious lines were forwarded to the LLM for further analysis (via LangChain).")
     lines.append("")
     lines.append("---")
     lines.append("")
@@ -212,9 +333,244 @@ def main():
     lines.append("Findings were analyzed by an LLM to reduce false positives and assess real security risk.")
     lines.append("")
 
-    summary = "\n".join(lines)
+    return "\n".join(lines)
+
+
+def baseline_main(argv: List[str]):
+    parser = argparse.ArgumentParser(prog="commitguard baseline", description="Write fingerprints of current findings to a baseline file")
+    parser.add_argument("--repo", required=True, help="URL GitHub-repo (HTTPS or SSH)")
+    parser.add_argument("--n", required=True, help="Amount of commits to fetch [1, 10000]")
+    parser.add_argument(
+        "--ref",
+        default=os.getenv("HEAD_SHA"),
+        help="Branch or commit SHA to list commits from, e.g. the PR head (default: $HEAD_SHA, else the default branch)"
+    )
+    parser.add_argument(
+        "--out",
+        default=DEFAULT_BASELINE_FILE,
+        help=f"Baseline file name (default: {DEFAULT_BASELINE_FILE})"
+    )
+    parser.add_argument(
+        "--with-paths",
+        action="store_true",
+        help="Scope fingerprints to the file they were found in"
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Keep fingerprints already present in the baseline file"
+    )
+    args = parser.parse_args(argv)
+
+    ghc = GitHubClient(args.repo)
+    ghc.authorize_github_api()
+    leaksparser = LeaksParser()
+
+    c_data = asyncio.run(ghc.run_fetching_async(int(args.n), GitHubClient.DEFAULT_CONCURRENCY, ref=args.ref))
+    suspicious_commits = scan_commits(ghc, leaksparser, c_data)
+
+    fingerprints = fingerprints_for(suspicious_commits, leaksparser.explain, args.with_paths)
+    if args.merge and os.path.exists(args.out):
+        with open(args.out, encoding="utf-8") as f:
+            fingerprints.extend(json.load(f).get("fingerprints", []))
+
+    Baseline.save(args.out, fingerprints)
+    return None
+
+
+def run_scan(args: argparse.Namespace, pipeline: "ScanPipeline") -> Tuple[List[Dict[str, Any]], requests.Session]:
+
+    if args.repo:
+        ghc = GitHubClient(args.repo, fetch_slots=threading.BoundedSemaphore(args.concurrency), commit_format=args.commit_format)
+
+        ghc.authorize_github_api(pool_size=args.concurrency)
+
+        try:
+            return asyncio.run(pipeline.run(ghc, int(args.n), args.concurrency, ref=args.ref)), ghc.session
+        except RuntimeError as e:
+            log.error(f"Scan failed: {e}")
+            sys.exit(1)
+
+    # one session (connection pool), one request limit and one rate limit budget for every repository
+    auth_client = GitHubClient("")
+    auth_client.authorize_github_api(pool_size=args.concurrency)
+
+    repo_urls = read_repos_file(args.repos_file) if args.repos_file else auth_client.list_org_repositories(args.org)
+    if not repo_urls:
+        log.error("No repositories to scan, exiting ..")
+        sys.exit(1)
+
+    max_repos = max(1, min(args.max_repos, len(repo_urls)))
+    per_repo_concurrency = max(1, -(-args.concurrency // max_repos))
+    fetch_slots = threading.BoundedSemaphore(args.concurrency)
+
+    clients = [
+        GitHubClient(url, session=auth_client.session, fetch_slots=fetch_slots, budget=auth_client.budget,
+                     commit_format=args.commit_format)
+        for url in repo_urls
+    ]
+
+    log.info(f"Batch scan of {len(clients)} repositories ({max_repos} at a time, {per_repo_concurrency} request(s) per repository)")
+    return asyncio.run(pipeline.run_many(clients, int(args.n), per_repo_concurrency, max_repos)), auth_client.session
+
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        from .server import serve_main
+        return serve_main(sys.argv[2:])
+
+    if sys.argv[1:2] == ["baseline"]:
+        return baseline_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(prog="commitguard", description="Scan github repository for commits (searching for some leaks / weak / insecure places)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--repo", help="URL GitHub-repo (HTTPS or SSH)")
+    source.add_argument("--repos-file", help="File with GitHub repository URLs, one per line")
+    source.add_argument("--org", help="Scan every (non archived) repository of a GitHub organization")
+    parser.add_argument("--n", required=True, help="Amount of commits to fetch [1, 10000]")
+    parser.add_argument(
+        "--ref",
+        default=os.getenv("HEAD_SHA"),
+        help="Branch or commit SHA to list commits from, e.g. the PR head (default: $HEAD_SHA, else the default branch)"
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="Max in-flight GitHub requests, shared by all repositories (default: 10)"
+    )
+
+    parser.add_argument(
+        "--max-repos",
+        type=int,
+        default=5,
+        help="Max repositories scanned at the same time in batch mode (default: 5)"
+    )
+
+    parser.add_argument(
+        "--out",
+        default="suspicious_commits.json",
+        help="Output json file name (default: suspicious_commits.json)"
+    )
+
+    parser.add_argument(
+        "--nofile",
+        action="store_true",
+        help="Do not save output to file"
+    )
+
+    parser.add_argument(
+        "--baseline",
+        help="Baseline file with fingerprints of known findings to suppress (see 'commitguard baseline')"
+    )
+
+    parser.add_argument(
+        "--triage-high",
+        type=float,
+        default=0.9,
+        help="Local score from which a finding is classified HIGH without the LLM (default: 0.9)"
+    )
+
+    parser.add_argument(
+        "--triage-ok",
+        type=float,
+        default=0.15,
+        help="Local score up to which a finding is classified OK without the LLM (default: 0.15)"
+    )
+
+    parser.add_argument(
+        "--no-triage",
+        action="store_true",
+        help="Send every finding to the LLM"
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=20,
+        help="Max commits / findings batches waiting between pipeline stages (default: 20)"
+    )
+
+    parser.add_argument(
+        "--llm-batch",
+        type=int,
+        default=50,
+        help="Findings collected before a batch is sent to the LLM (default: 50)"
+    )
+
+    parser.add_argument(
+        "--commit-format",
+        choices=GitHubClient.COMMIT_FORMATS,
+        default="json",
+        help="Fetch commits as JSON objects or as streamed unified diffs (default: json)"
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        help="State file the scan progress is saved to periodically"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the state saved in --checkpoint"
+    )
+
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=DEFAULT_CHECKPOINT_INTERVAL,
+        help=f"Seconds between checkpoint saves (default: {DEFAULT_CHECKPOINT_INTERVAL:g})"
+    )
+    args = parser.parse_args()
+    # every record of this run carries the same id in JSON logs (LOG_FORMAT=json)
+    bind_log_context(run=uuid.uuid4().hex[:12])
+    scorer = None if args.no_triage else TriageScorer(args.triage_high, args.triage_ok)
+    leaksparser = LeaksParser()
+    baseline = Baseline.load(args.baseline) if args.baseline else None
+
+    if args.resume and not args.checkpoint:
+        log.error("--resume needs --checkpoint, exiting ..")
+        sys.exit(1)
+
+    checkpoint = None
+    if args.checkpoint:
+        if args.resume and os.path.exists(args.checkpoint):
+            checkpoint = Checkpoint.load(args.checkpoint, args.checkpoint_interval)
+        else:
+            if os.path.exists(args.checkpoint):
+                log.warning(f"Checkpoint {args.checkpoint} exists and is overwritten, pass --resume to continue from it")
+            checkpoint = Checkpoint(args.checkpoint, args.checkpoint_interval)
+
+    # fetching, scanning and LLM classification overlap instead of running one after another
+    from .pipeline import ScanPipeline
+    pipeline = ScanPipeline(leaksparser, baseline, scorer, llm_from_env(), queue_size=args.queue_size,
+                            llm_batch_lines=args.llm_batch, checkpoint=checkpoint)
+
+    try:
+        suspicious_commits, session = run_scan(args, pipeline)
+    finally:
+        # whatever was done before a crash or a timeout is kept for --resume
+        if checkpoint is not None:
+            checkpoint.save()
+
+    if leaksparser.memo is not None:
+        log.info(f"Scan memo: {leaksparser.memo.hits} line lookup(s) served from memo, {leaksparser.memo.misses} scanned")
+
+    if not suspicious_commits:
+        log.info("Leaks parser did not find anything suspicious. Exiting...")
+        write_pr_msg(session=session)
+        return None
+
+    log.info(f"Leaks parser found {len(suspicious_commits)} suspicious line(s)")
+
+    stats = severity_stats(suspicious_commits)
+
+    if args.nofile == False:
+        save_results_to_file(suspicious_commits, args.out)
 
-    write_pr_msg(summary)
+    write_pr_msg(build_summary(suspicious_commits, stats), suspicious_commits, session)
     return None
 
 if __name__ == "__main__":
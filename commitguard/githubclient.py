@@ -1,16 +1,69 @@
 import re
 import os
+import itertools
 import sys
 import requests
 import asyncio
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator, Iterable
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from .logging_config import get_logger
+from .cache import LRUCache
+from .cassette import CassetteAdapter, cassette_from_env
+from .preprocess import FilePreprocessor
+from .logging_config import debug_enabled, get_logger
 
 log = get_logger(__name__)
 
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+
+class RateLimitBudget:
+    """GitHub API budget shared by every client of a run, kept in sync with X-RateLimit-* headers."""
+
+    def __init__(self, reserve: int = 0):
+        self.__lock = threading.Lock()
+        self.__remaining = None
+        self.__reset_at = 0.0
+        self.__reserve = reserve
+
+    @property
+    def remaining(self):
+        return self.__remaining
+
+    def observe(self, headers):
+        try:
+            remaining = int(headers.get("X-RateLimit-Remaining"))
+            reset_at = float(headers.get("X-RateLimit-Reset") or 0)
+        except (TypeError, ValueError):
+            return
+
+        with self.__lock:
+            # responses of concurrent requests arrive out of order, only a new window may raise the budget
+            if self.__remaining is None or reset_at > self.__reset_at:
+                self.__remaining = remaining
+                self.__reset_at = reset_at
+            else:
+                self.__remaining = min(self.__remaining, remaining)
+
+    def acquire(self):
+        while True:
+            with self.__lock:
+                if self.__remaining is None or self.__remaining > self.__reserve:
+                    if self.__remaining is not None:
+                        self.__remaining -= 1
+                    return
+
+                wait = self.__reset_at - time.time()
+                if wait <= 0:
+                    self.__remaining = None
+                    continue
+
+            log.warning(f"GitHub rate limit budget exhausted, waiting {int(wait)}s for reset")
+            time.sleep(min(wait, 60))
 
 
 class GitHubClient:
@@ -19,21 +72,76 @@ class GitHubClient:
         ".yml", ".yaml", ".json", ".cfg",
         ".sh", ".bash", ".key", ".ipynb"
     }
-    MAX_COMMITS = 100
+    MAX_COMMITS = 10_000
+    COMMITS_PER_PAGE = 100
+    DEFAULT_CONCURRENCY = 10
+
+    # "json" - full commit objects, "diff" - plain unified diff streamed and parsed line by line,
+    # author / date / message then come from the commit list
+    COMMIT_FORMATS = ("json", "diff")
+    DIFF_MEDIA_TYPE = "application/vnd.github.diff"
+    HUNK_HEADER = re.compile(
+        r"@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@")
+    # git writes no ---/+++ lines for binary files, the paths are only in this line
+    BINARY_FILES = re.compile(r"^Binary files (?P<old>.+) and (?P<new>.+) differ$")
+
+    # fallback for files whose patch GitHub omits (diff too large)
+    MAX_BLOB_BYTES = 5 * 1024 * 1024
+    BLOB_CHUNK_BYTES = 64 * 1024
+    BLOB_CHUNK_LINES = 500
+
+    def __init__(self, repo_url: str, session: requests.Session | None = None,
+                 fetch_slots: threading.BoundedSemaphore | None = None, budget: RateLimitBudget | None = None,
+                 api_url: str = GITHUB_API_URL, commit_cache: LRUCache | None = None, commit_format: str = "json"):
+        if commit_format not in self.COMMIT_FORMATS:
+            raise ValueError(f"Unknown commit format {commit_format!r}, expected one of {self.COMMIT_FORMATS}")
 
-    def __init__(self, repo_url: str):
         owner, repo = self.__parse_github_url(repo_url)
-        self.__commits_lists_url = f"https://api.github.com/repos/{owner}/{repo}/commits"
-        self.__commits_details_url = f"https://api.github.com/repos/{owner}/{repo}/commits/{{sha}}"
-        self.__session = requests.Session()
+        self.__repo_name = f"{owner}/{repo}"
+        self.__api_url = api_url.rstrip("/")
+        self.__commits_lists_url = f"{self.__api_url}/repos/{owner}/{repo}/commits"
+        self.__commits_details_url = f"{self.__api_url}/repos/{owner}/{repo}/commits/{{sha}}"
+        self.__contents_url = f"{self.__api_url}/repos/{owner}/{repo}/contents/{{path}}"
+        self.__session = session or requests.Session()
         self.__commit_data = None
+        self.__commit_format = commit_format
+        # author / date / message of listed commits, the diff media type carries none of them
+        self.__commit_meta: Dict[str, Dict] = {}
+        # commits are immutable, a long running process keeps them across scans
+        self.__commit_cache = commit_cache
+        # limits in-flight requests to GitHub, shared by commit and blob fetching
+        # (and by every repository of a batch run when passed in)
+        self.__shared_slots = fetch_slots is not None
+        self.__fetch_slots = fetch_slots or threading.BoundedSemaphore(self.DEFAULT_CONCURRENCY)
+        self.__budget = budget or RateLimitBudget()
+
+    @property
+    def repo_name(self) -> str:
+        return self.__repo_name
+
+    @property
+    def session(self) -> requests.Session:
+        return self.__session
+
+    @property
+    def budget(self) -> RateLimitBudget:
+        return self.__budget
 
     #region PUBLIC methods
-    def authorize_github_api(self):
+    def authorize_github_api(self, pool_size: int = DEFAULT_CONCURRENCY):
         load_dotenv()
         github_token = os.getenv("GH_PAT")
         self.__session = requests.Session()
 
+        # COMMITGUARD_CASSETTE records / replays every API response (offline runs and load tests)
+        cassette = cassette_from_env()
+        if cassette is not None:
+            adapter = CassetteAdapter(cassette, pool_connections=pool_size, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
+
         if not github_token:
             log.error("Error there is no GITHUB_TOKEN in environment")
             sys.exit(1)
@@ -47,7 +155,7 @@ class GitHubClient:
             self.__session.headers["Authorization"] = f"token {github_token}"
 
 
-        resp = self.__session.get("https://api.github.com/user", timeout=10)
+        resp = self.__session.get(f"{self.__api_url}/user", timeout=10)
 
         if resp.status_code == 200:
             try:
@@ -58,6 +166,7 @@ class GitHubClient:
 
             limit = resp.headers.get("X-RateLimit-Limit")
             remaining = resp.headers.get("X-RateLimit-Remaining")
+            self.__budget.observe(resp.headers)
 
             log.info(f"Auth in Github API successful [ User login = {data.get("login")}, rate_limits = {remaining}/{limit}, 1 commit - 1 token ]")
 
@@ -67,7 +176,7 @@ class GitHubClient:
             log.error(f"Status: {resp.status_code} Body: {body[:200]}")
             sys.exit(1)
 
-    def run_fetching_sync(self, number_of_commits : int):
+    def run_fetching_sync(self, number_of_commits : int, ref: str | None = None):
 
         if number_of_commits > self.MAX_COMMITS or number_of_commits < 1:
             log.error(f"Invalid number of commits [1:{self.MAX_COMMITS}], exiting ..")
@@ -75,21 +184,21 @@ class GitHubClient:
 
         log.info(f"Fetching {number_of_commits} commit(s) ...")
         start_time = time.time()
-        commit_hashes = self.__fetch_commits_list(number_of_commits)
+        commit_hashes = self.__fetch_commits_list(number_of_commits, ref)
         commit_data: Dict[str, Dict] = {}
 
         for commit_hash in commit_hashes:
-            log.debug(f"Fetching commit {commit_hash}")
+            log.debug("Fetching commit %s", commit_hash)
             commit_data[commit_hash] = self.__fetch_commit_details_sync(commit_hash)
 
         log.info(f"Successfully fetched {number_of_commits} commit(s)")
         delta_time = time.time() - start_time
-        log.debug(f"Elapsed time: {delta_time} seconds")
+        log.debug("Elapsed time: %.3f seconds", delta_time)
         self.__commit_data = commit_data
 
         return commit_data
 
-    async def run_fetching_async(self, number_of_commits : int, max_concurrency: int) :
+    async def run_fetching_async(self, number_of_commits : int, max_concurrency: int, ref: str | None = None) :
 
         if number_of_commits > self.MAX_COMMITS or number_of_commits < 1:
             log.error(f"Invalid number of commits [1:{self.MAX_COMMITS}], exiting ..")
@@ -98,12 +207,14 @@ class GitHubClient:
         log.info(f"Fetching {number_of_commits} commit(s) ...")
 
         start_time = time.time()
-        commit_hashes = await asyncio.to_thread(self.__fetch_commits_list, number_of_commits)
+        commit_hashes = await asyncio.to_thread(self.__fetch_commits_list, number_of_commits, ref)
 
         sem = asyncio.Semaphore(max_concurrency)
+        if not self.__shared_slots:
+            self.__fetch_slots = threading.BoundedSemaphore(max_concurrency)
 
         async def guarded(commit_hash: str):
-            log.debug(f"Fetching commit {commit_hash}")
+            log.debug("Fetching commit %s", commit_hash)
             async with sem:
                 return await self.__fetch_commit_details_async(commit_hash)
 
@@ -116,7 +227,7 @@ class GitHubClient:
             commit_data[commit_hash] = data
 
         delta_time = time.time() - start_time
-        log.debug(f"Elapsed time: {delta_time} seconds")
+        log.debug("Elapsed time: %.3f seconds", delta_time)
         self.__commit_data = commit_data
 
         return commit_data
@@ -129,7 +240,7 @@ class GitHubClient:
 
         for sha, data in self.__commit_data.items():
             if sha == commit_hash:
-                log.debug(f"Found commit {sha}")
+                log.debug("Found commit %s", sha)
                 c_data = data
                 break
 
@@ -137,94 +248,146 @@ class GitHubClient:
             log.error(f"Not found commit {commit_hash}")
             return None
 
-        line_regex = re.compile(
-            r"@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@")
+        return self.parse_commit_details(c_data)
 
-        def right_filename_extension(filename: str):
+    def list_commits(self, number_of_commits: int, ref: str | None = None) -> List[str]:
+        return self.__fetch_commits_list(number_of_commits, ref)
 
-            path = Path(filename)
+    def fetch_commit(self, commit_hash: str) -> Dict:
+        return self.__fetch_commit_details_sync(commit_hash)
 
-            ext = path.suffix.lower()
-            if ext in self.ALLOWED_EXTENSIONS:
-                log.debug(f"{filename} allowed extension ")
-                return True
-
-            log.debug(f"{filename} ignored extension ")
-            return False
-
-
-        additions: List[Dict[str, str]] = []
-        deletions: List[Dict[str, str]] = []
-
-
-        for f in c_data.get("files", []):
-            patch = f.get("patch")
-            if not patch:
-                continue
-
-            filename = f["filename"]
-            if not right_filename_extension(filename):
-                continue
+    def parse_commit_details(self, c_data: Dict) -> Dict:
 
-            addition_line_number = None
-            deletion_line_number = None
-
-            for line in patch.splitlines():
-                m = line_regex.match(line)
-                if m:
-                    addition_line_number = int(m.group("new_start"))
-                    deletion_line_number = int(m.group("old_start"))
-                    continue
-
-                if line.startswith("+") and not line.startswith("+++"):
-                    location = f"{filename}:{addition_line_number if addition_line_number is not None else ''}"
-                    text = line[1:]
-                    additions.append({"location": location, "code": text})
-                    if addition_line_number is not None:
-                        addition_line_number += 1
+        if "diff" in c_data:
+            # fetched as a unified diff, already parsed while streaming
+            additions = c_data["diff"]["additions"]
+            deletions = c_data["diff"]["deletions"]
+            truncated_files = c_data["diff"]["truncated_files"]
+        else:
+            additions: List[Dict[str, str]] = []
+            deletions: List[Dict[str, str]] = []
+            truncated_files: List[str] = []
+
+            for f in c_data.get("files", []):
+                patch = f.get("patch")
+                filename = f["filename"]
+
+                if not patch:
+                    # GitHub drops the patch for very large diffs, contents are fetched lazily instead
+                    if f.get("status") != "removed" and f.get("changes", 0) > 0 and self.__right_extension(filename):
+                        log.debug("%s has no patch, marked for blob fetching", filename)
+                        truncated_files.append(filename)
                     continue
 
-                if line.startswith("-") and not line.startswith("---"):
-                    location = f"{filename}:{deletion_line_number if deletion_line_number is not None else ''}"
-                    text = line[1:]
-                    deletions.append({"location": location, "code": text})
-                    if deletion_line_number is not None:
-                        deletion_line_number += 1
+                if not self.__right_extension(filename):
                     continue
 
-                if line.startswith(" "):
-                    if addition_line_number is not None:
-                        addition_line_number += 1
-                    if deletion_line_number is not None:
-                        deletion_line_number += 1
-                    continue
+                self.__parse_patch(filename, patch.splitlines(), additions, deletions)
 
 
         details = {
             "additions": additions,
             "deletions": deletions,
+            "truncated_files": truncated_files,
             "author": c_data.get("author_name"),
             "date": c_data.get("date"),
             "commit_message": c_data.get("commit_message"),
         }
 
         return details
+
+    def list_org_repositories(self, org: str) -> List[str]:
+
+        repos: List[str] = []
+        page = 1
+
+        while True:
+            resp = self.__get(f"{self.__api_url}/orgs/{org}/repos",
+                              params={"per_page": 100, "page": page, "type": "all"}, timeout=20)
+            resp.raise_for_status()
+            data = resp.json()
+            if not data:
+                break
+
+            repos.extend(item["html_url"] for item in data if not item.get("archived"))
+            page += 1
+
+        log.info(f"Found {len(repos)} repositories in {org}")
+        return repos
+
+    def iter_file_chunks(self, commit_hash: str, filename: str, preprocess: bool = True) -> Iterator[List[Dict[str, str]]]:
+
+        url = self.__contents_url.format(path=quote(filename))
+        headers = {"Accept": "application/vnd.github.raw"}
+
+        self.__budget.acquire()
+        with self.__fetch_slots:
+            try:
+                resp = self.__session.get(url, params={"ref": commit_hash}, headers=headers, stream=True, timeout=20)
+                self.__budget.observe(resp.headers)
+                resp.raise_for_status()
+            except requests.RequestException as e:
+                log.error(f"Fetching contents of {filename} failed for {commit_hash}")
+                log.error(f"Request error: {e}")
+                return
+
+            with resp:
+                size = int(resp.headers.get("Content-Length") or 0)
+                if size > self.MAX_BLOB_BYTES:
+                    log.warning(f"{filename} is {size} bytes (limit {self.MAX_BLOB_BYTES}), skipping")
+                    return
+
+                chunk: List[Dict[str, str]] = []
+                read_bytes = 0
+                preprocessor = FilePreprocessor(filename) if preprocess else None
+
+                for line_number, raw in enumerate(resp.iter_lines(chunk_size=self.BLOB_CHUNK_BYTES), start=1):
+                    read_bytes += len(raw) + 1
+                    if read_bytes > self.MAX_BLOB_BYTES:
+                        log.warning(f"{filename} exceeded {self.MAX_BLOB_BYTES} bytes, rest of the file is skipped")
+                        break
+
+                    text = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+                    for code in (preprocessor.process(text) if preprocessor else [text]):
+                        chunk.append({"location": f"{filename}:{line_number}", "code": code})
+
+                    if len(chunk) >= self.BLOB_CHUNK_LINES:
+                        yield chunk
+                        chunk = []
+
+                if chunk:
+                    yield chunk
     #endregion
 
     # region PRIVATE methods
 
-    def __fetch_commits_list(self, number_of_commits: int) -> List[str]:
+    def __fetch_commits_list(self, number_of_commits: int, ref: str | None = None) -> List[str]:
 
         if(number_of_commits > self.MAX_COMMITS or number_of_commits < 1):
             log.error(f"Invalid number of commits [1:{self.MAX_COMMITS}], exiting ..")
             sys.exit(1)
 
-        params = {"per_page": number_of_commits}
-        resp = self.__session.get(self.__commits_lists_url, params=params, timeout=20)
+        per_page = min(number_of_commits, self.COMMITS_PER_PAGE)
+        params = {"per_page": per_page}
+        if ref:
+            params["sha"] = ref
+
+        commit_hashes: List[str] = []
+        page = 1
+        while len(commit_hashes) < number_of_commits:
+            resp = self.__get(self.__commits_lists_url, params={**params, "page": page}, timeout=20)
+
+            resp.raise_for_status()
+            data = resp.json()
+            for item in data:
+                commit_hashes.append(item["sha"])
+                if "commit" in item:
+                    self.__commit_meta[item["sha"]] = self.__commit_summary(item)
+            if len(data) < per_page:
+                break
+            page += 1
 
-        resp.raise_for_status()
-        data = resp.json()
-        commit_hashes = [item["sha"] for item in data][:number_of_commits]
+        commit_hashes = commit_hashes[:number_of_commits]
 
         if len(commit_hashes) < number_of_commits:
             log.warning(f"warning : fetched only {len(commit_hashes)} SHA")
@@ -233,34 +396,180 @@ class GitHubClient:
 
     def __fetch_commit_details_sync(self, commit_hash: str) -> Dict:
 
-        log.debug(f"fetching commit details for {commit_hash}")
+        if self.__commit_cache is not None:
+            cached = self.__commit_cache.get(commit_hash)
+            if cached is not None:
+                log.debug("commit %s served from cache", commit_hash)
+                return cached
+
+        log.debug("fetching commit details for %s", commit_hash)
         url = self.__commits_details_url.format(sha=commit_hash)
 
         try:
-            resp = self.__session.get(url, timeout=20)
-            resp.raise_for_status()
+            diff = self.__fetch_commit_diff(commit_hash) if self.__commit_format == "diff" else None
+            if diff is None:
+                resp = self.__get(url, timeout=20)
+                resp.raise_for_status()
 
         except requests.RequestException as e:
             log.error(f"Fetching failed for {commit_hash}")
             log.error(f"Request error: {e}")
             sys.exit(1)
 
-        j = resp.json() or {}
-        commit = j.get("commit") or {}
-        author = commit.get("author") or {}
-        files = j.get("files") or []
+        if diff is not None:
+            meta = self.__commit_meta.get(commit_hash) or {"author_name": None, "date": None, "commit_message": None}
+            data = {"sha": commit_hash, **meta, "diff": diff}
+        else:
+            j = resp.json() or {}
+            data = {"sha": j.get("sha"), **self.__commit_summary(j), "files": j.get("files") or []}
 
+        if self.__commit_cache is not None:
+            self.__commit_cache.put(commit_hash, data)
+
+        return data
+
+    @staticmethod
+    def __commit_summary(item: Dict) -> Dict:
+        commit = item.get("commit") or {}
+        author = commit.get("author") or {}
         msg = (commit.get("message") or "")
-        first_line = msg.partition("\n")[0]
 
         return {
-            "sha": j.get("sha"),
             "author_name": author.get("name"),
             "date": author.get("date"),
-            "commit_message": first_line,
-            "files": files,
+            "commit_message": msg.partition("\n")[0],
         }
 
+    def __fetch_commit_diff(self, commit_hash: str) -> Dict | None:
+
+        url = self.__commits_details_url.format(sha=commit_hash)
+
+        self.__budget.acquire()
+        with self.__fetch_slots:
+            resp = self.__session.get(url, headers={"Accept": self.DIFF_MEDIA_TYPE}, stream=True, timeout=20)
+            self.__budget.observe(resp.headers)
+
+            with resp:
+                if resp.status_code in (406, 422):
+                    # GitHub refuses to render diffs above its size limits, the JSON object still has the files
+                    log.info(f"Diff of {commit_hash} is too large ({resp.status_code}), falling back to JSON")
+                    return None
+                resp.raise_for_status()
+
+                lines = (raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+                         for raw in resp.iter_lines(chunk_size=self.BLOB_CHUNK_BYTES))
+                return self.__parse_diff(lines)
+
+    def __parse_diff(self, lines: Iterable[str]) -> Dict:
+
+        additions: List[Dict[str, str]] = []
+        deletions: List[Dict[str, str]] = []
+        truncated_files: List[str] = []
+
+        # one group per "diff --git" section, consumed line by line as the response streams in
+        section = 0
+        def section_of(line: str) -> int:
+            nonlocal section
+            if line.startswith("diff --git "):
+                section += 1
+            return section
+
+        for _, file_lines in itertools.groupby(lines, key=section_of):
+            old_name = new_name = None
+            binary = False
+            first_hunk = None
+
+            for line in file_lines:
+                if line.startswith("@@"):
+                    first_hunk = line
+                    break
+                if line.startswith("--- "):
+                    old_name = self.__diff_path(line[4:])
+                elif line.startswith("+++ "):
+                    new_name = self.__diff_path(line[4:])
+                elif line.startswith("Binary files "):
+                    binary = True
+                    m = self.BINARY_FILES.match(line)
+                    if m:
+                        old_name, new_name = self.__diff_path(m.group("old")), self.__diff_path(m.group("new"))
+
+            filename = new_name or old_name
+            if filename is None or not self.__right_extension(filename):
+                # drain the section, groupby moves on only once it is consumed
+                for _ in file_lines:
+                    pass
+                continue
+
+            if binary:
+                # no text hunks, the contents are fetched lazily like an omitted JSON patch
+                if new_name is not None:
+                    truncated_files.append(filename)
+                continue
+
+            if first_hunk is not None:
+                self.__parse_patch(filename, itertools.chain([first_hunk], file_lines), additions, deletions)
+
+        return {"additions": additions, "deletions": deletions, "truncated_files": truncated_files}
+
+    @staticmethod
+    def __diff_path(path: str) -> str | None:
+        path = path.rstrip("\t").strip('"')
+        if path == "/dev/null":
+            return None
+        return path[2:] if path[:2] in ("a/", "b/") else path
+
+    def __parse_patch(self, filename: str, lines: Iterable[str], additions: List[Dict[str, str]], deletions: List[Dict[str, str]]):
+
+        addition_line_number = None
+        deletion_line_number = None
+        preprocessor = FilePreprocessor(filename)
+
+        for line in lines:
+            m = self.HUNK_HEADER.match(line)
+            if m:
+                addition_line_number = int(m.group("new_start"))
+                deletion_line_number = int(m.group("old_start"))
+                preprocessor.reset()
+                continue
+
+            if line.startswith("+") and not line.startswith("+++"):
+                location = f"{filename}:{addition_line_number if addition_line_number is not None else ''}"
+                for text in preprocessor.process(line[1:]):
+                    additions.append({"location": location, "code": text})
+                if addition_line_number is not None:
+                    addition_line_number += 1
+                continue
+
+            if line.startswith("-") and not line.startswith("---"):
+                location = f"{filename}:{deletion_line_number if deletion_line_number is not None else ''}"
+                for text in preprocessor.process(line[1:]):
+                    deletions.append({"location": location, "code": text})
+                if deletion_line_number is not None:
+                    deletion_line_number += 1
+                continue
+
+            if line.startswith(" "):
+                preprocessor.observe(line[1:])
+                if addition_line_number is not None:
+                    addition_line_number += 1
+                if deletion_line_number is not None:
+                    deletion_line_number += 1
+                continue
+
+    def __right_extension(self, filename: str) -> bool:
+
+        allowed = Path(filename).suffix.lower() in self.ALLOWED_EXTENSIONS
+        if debug_enabled(log):
+            log.debug("%s %s extension", filename, "allowed" if allowed else "ignored")
+        return allowed
+
+    def __get(self, url: str, **kwargs) -> requests.Response:
+        self.__budget.acquire()
+        with self.__fetch_slots:
+            resp = self.__session.get(url, **kwargs)
+        self.__budget.observe(resp.headers)
+        return resp
+
     async def __fetch_commit_details_async(self, commit_hash: str) -> Tuple[str, Dict]:
         data = await asyncio.to_thread(self.__fetch_commit_details_sync, commit_hash)
         return commit_hash, data
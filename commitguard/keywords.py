@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton: every keyword occurrence in a line is found in one pass,
+    independent of the number of keywords. Matching is case insensitive."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.__goto: List[Dict[str, int]] = [{}]
+        self.__out: List[Tuple[str, ...]] = [()]
+        self.keywords: Set[str] = set()
+
+        for keyword in keywords:
+            self.__insert(keyword.lower())
+
+        self.__build()
+
+    def find(self, text: str) -> Set[str]:
+
+        goto = self.__goto
+        out = self.__out
+        state = 0
+        found: Set[str] = set()
+
+        for ch in text.lower():
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return found
+
+    def __insert(self, keyword: str):
+        if not keyword:
+            return
+
+        state = 0
+        for ch in keyword:
+            nxt = self.__goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.__goto)
+                self.__goto[state][ch] = nxt
+                self.__goto.append({})
+                self.__out.append(())
+            state = nxt
+
+        self.__out[state] = self.__out[state] + (keyword,)
+        self.keywords.add(keyword)
+
+    def __build(self):
+        alphabet = {ch for keyword in self.keywords for ch in keyword}
+        fail = [0] * len(self.__goto)
+        # children of the root fail back to the root
+        queue = deque(self.__goto[0].values())
+
+        # breadth first, so fail states (always shallower) are complete before they are used
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.__goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = self.__goto[fail[state]].get(ch, 0)
+                self.__out[nxt] = self.__out[nxt] + self.__out[fail[nxt]]
+
+            # turn the trie into a full transition table, no fail link walking while matching
+            for ch in alphabet:
+                if ch not in self.__goto[state]:
+                    self.__goto[state][ch] = self.__goto[fail[state]].get(ch, 0)
@@ -1,9 +1,62 @@
 import re
-from typing import List, Tuple
-from .logging_config import get_logger
+import hashlib
+from typing import List, Tuple, Dict, Set, Any
+from .cache import LRUCache
+from .keywords import KeywordMatcher
+from .logging_config import LogSampler, debug_enabled, get_logger
 import math
+import time
+
+try:
+    # optional linear time (RE2) backend, pip install google-re2
+    import re2
+except ImportError:
+    re2 = None
 
 log = get_logger(__name__)
+line_sampler = LogSampler(log)
+
+
+def compile_rules(rules: List[Tuple[str, str]], linear_time: Set[str]) -> List[Any]:
+
+    compiled = []
+    for name, rx in rules:
+        if name in linear_time and re2 is not None:
+            try:
+                compiled.append(re2.compile(rx))
+                continue
+            except Exception as e:
+                log.warning(f"Rule {name} is not RE2 compatible, using re: {e}")
+        compiled.append(re.compile(rx))
+
+    return compiled
+
+
+# characters do not bound regex work (the plain re backend backtracks on some lines), the time does
+MAX_FILE_SCAN_SECONDS = 10.0
+
+
+class ScanBudget:
+    """Upper bound of characters and of seconds scanned for one file, the rest is skipped instead of stalling the scan."""
+
+    def __init__(self, max_chars: int, max_seconds: float = MAX_FILE_SCAN_SECONDS):
+        self.remaining = max_chars
+        self.exhausted = False
+        self.deadline = time.monotonic() + max_seconds
+        self.timed_out = False
+
+    def take(self, chars: int) -> bool:
+        if self.exhausted or chars > self.remaining:
+            self.exhausted = True
+            return False
+        self.remaining -= chars
+        return True
+
+    def in_time(self) -> bool:
+        if not self.timed_out and time.monotonic() > self.deadline:
+            self.timed_out = True
+        return not self.timed_out
+
 
 class LeaksParser:
     TEST_WORDS = [
@@ -11,6 +64,15 @@ class LeaksParser:
         "dev", "staging", "local", "ci", "fixture", "mock", "demo", "placeholder", "fake", "password", "supersecret"
     ]
 
+    # environment names are weak hints: one alone does not suppress a line, it reaches triage as a scored feature
+    WEAK_CONTEXT_WORDS = {"sandbox", "dev", "staging", "local", "ci"}
+    WEAK_CONTEXT_WEIGHT = 0.5
+
+    # keyword -> suppression weight, a line is treated as test/context code once its hits reach CONTEXT_SUPPRESS_WEIGHT
+    CONTEXT_WORDS: Dict[str, float] = {**dict.fromkeys(TEST_WORDS, 1.0), **dict.fromkeys(WEAK_CONTEXT_WORDS, WEAK_CONTEXT_WEIGHT)}
+    CONTEXT_SUPPRESS_WEIGHT = 1.0
+    CONTEXT_MATCHER = KeywordMatcher(CONTEXT_WORDS)
+
     RULES: List[Tuple[str, str]] = [
         ("PrivateKeyBlock", r"-----BEGIN (?:RSA|DSA|EC|OPENSSH|PGP) PRIVATE KEY-----"),
         ("AWSAccessKeyID", r"\bAKIA[0-9A-Z]{16}\b"),
@@ -24,74 +86,159 @@ class LeaksParser:
         ("PasswordAssignment", r"(?i)\b(pass(word)?|secret|token|api[_-]?key)\b\s*[:=]\s*['\"][^'\"]{6,}['\"]"),
         ("BasicAuthInURL", r"(?i)\b[a-z][a-z0-9+\-.]*://[^/\s:@]+:[^@\s]+@"),
     ]
-    COMPILED_RULES = [re.compile(rx) for _, rx in RULES]
+    # rules prone to heavy backtracking on long lines, matched by RE2 when it is installed
+    LINEAR_TIME_RULES = {"TelegramBotToken", "JWT", "PasswordAssignment", "BasicAuthInURL"}
+    COMPILED_RULES = compile_rules(RULES, LINEAR_TIME_RULES)
+
+    # per-line and per-file work caps
+    MAX_LINE_CHARS = 4096
+    MAX_FILE_SCAN_CHARS = 5 * 1024 * 1024
+
+    ENTROPY_RULE = "HighEntropyString"
+    ENTROPY_THRESHOLD = 4.0
+    ENTROPY_CANDIDATE = re.compile(r"[A-Za-z0-9_\-+/=]{20,}")
+
+    # verdicts of lines already scanned in this run, keyed by a hash of the (capped) line; moved lines and
+    # repeated hunks are resolved with a lookup instead of another regex and entropy pass
+    MEMO_SIZE = 50_000
 
 
-    def __init__(self):
+    def __init__(self, memo_size: int = MEMO_SIZE):
         log.info("Initializing Leaks parser")
+        self.memo = LRUCache(max_size=memo_size) if memo_size > 0 else None
+
+    def run_scanner(self, lines : List[str], budget: ScanBudget | None = None):
+
+        # hot path: nothing is formatted unless debug output is on (for this repository)
+        debug = debug_enabled(log)
+        if debug:
+            log.debug("Running scanner on %d lines", len(lines))
+        budget = budget or ScanBudget(self.MAX_FILE_SCAN_CHARS)
+        texts = self.__apply_caps(lines, budget)
+
+        verdicts = []
+        timed_out = 0
+        for text in texts:
+            if text is not None and not budget.in_time():
+                text = None
+                timed_out += 1
+            verdicts.append(self.__verdict(text) if text is not None else None)
 
-    def run_scanner(self, lines : List[str]):
+        if timed_out:
+            log.warning(f"Scan time budget exhausted, {timed_out} line(s) of the file skipped")
 
-        log.debug(f"Running scanner on {len(lines)} lines")
-        rules_hits = self.__lines_matching_rules(lines)
-        entropy_hits = self.__lines_matching_entropy(lines)
-        test_hits = self.__lines_matching_test_words(lines)
+        rules_hits = [line for line, v in zip(lines, verdicts) if v and v["rule"]]
+        entropy_hits = [line for line, v in zip(lines, verdicts) if v and v["entropy"]]
+        test_hits = {line for line, v in zip(lines, verdicts) if v and v["test"]}
 
-        log.debug(f"Rule hits: {rules_hits}")
-        log.debug(f"Entropy hits: {entropy_hits}")
-        log.debug(f"Test hits: {test_hits}")
+        if debug:
+            log.debug("Rule hits: %d, entropy hits: %d, test hits: %d", len(rules_hits), len(entropy_hits), len(test_hits))
 
         results: List[str] = []
+        seen: Set[str] = set()
 
         for line in rules_hits:
-            if line not in results and line not in test_hits:
+            if line not in seen and line not in test_hits:
                 results.append(line)
-                log.debug(f"  [+] added from RULES: {line}")
+                seen.add(line)
+                if debug and line_sampler.allow("scanner line"):
+                    log.debug("  [+] added from RULES: %s", line)
 
         for line in entropy_hits:
-            if line not in results and line not in test_hits:
+            if line not in seen and line not in test_hits:
                 results.append(line)
-                log.debug(f"  [+] added from ENTROPY: {line}")
+                seen.add(line)
+                if debug and line_sampler.allow("scanner line"):
+                    log.debug("  [+] added from ENTROPY: %s", line)
 
-        if not results:
+        if debug and not results:
             log.debug("Nothing suspicious detected")
         return results
 
-    def __lines_matching_rules(self, lines: List[str]) -> List[str]:
+    def explain(self, line: str) -> Dict[str, Any] | None:
 
-        result: List[str] = []
+        line = line[:self.MAX_LINE_CHARS]
+        verdict = self.__verdict(line)
+        if "explain" not in verdict:
+            verdict["explain"] = self.__explain(line)
 
-        for line in lines:
-            for rx in self.COMPILED_RULES:
-                if rx.search(line):
-                    result.append(line)
-                    break
-
-        return result
+        hit = verdict["explain"]
+        # the memo entry is shared, callers get their own copy
+        return dict(hit, context=list(hit["context"])) if hit is not None else None
 
-    def __lines_matching_test_words(self,lines: List[str]) -> List[str]:
-
-        result: List[str] = []
-
-        for line in lines:
-            ln = line.lower()
-            if any(w in ln for w in self.TEST_WORDS):
-                result.append(line)
+    def context_words(self, line: str) -> Set[str]:
+        return self.CONTEXT_MATCHER.find(line)
 
-        return result
+    def context_weight(self, line: str) -> float:
+        return sum(self.CONTEXT_WORDS.get(w, 0.0) for w in self.context_words(line))
 
-    def __lines_matching_entropy(self,lines: List[str], threshold: float = 4.0) -> List[str]:
+    def __apply_caps(self, lines: List[str], budget: ScanBudget) -> List[str | None]:
 
-        result: List[str] = []
-        candidate = re.compile(r"[A-Za-z0-9_\-+/=]{20,}")
+        texts: List[str | None] = []
+        truncated = 0
+        skipped = 0
 
         for line in lines:
-            for match in candidate.findall(line):
-                if self.__shannon_entropy(match) >= threshold:
-                    result.append(line)
+            text = line
+            if len(text) > self.MAX_LINE_CHARS:
+                text = text[:self.MAX_LINE_CHARS]
+                truncated += 1
+
+            if not budget.take(len(text)):
+                texts.append(None)
+                skipped += 1
+                continue
+
+            texts.append(text)
+
+        if truncated:
+            log.info(f"{truncated} line(s) longer than {self.MAX_LINE_CHARS} chars, only their beginning is scanned")
+        if skipped:
+            log.warning(f"Scan budget of {self.MAX_FILE_SCAN_CHARS} chars exhausted, {skipped} line(s) skipped")
+
+        return texts
+
+    def __verdict(self, text: str) -> Dict[str, Any]:
+
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        verdict = self.memo.get(key) if self.memo is not None else None
+        if verdict is not None:
+            return verdict
+
+        verdict = {
+            "rule": self.__matches_rules(text),
+            "entropy": self.__matches_entropy(text),
+            "test": self.context_weight(text) >= self.CONTEXT_SUPPRESS_WEIGHT,
+        }
+        if self.memo is not None:
+            self.memo.put(key, verdict)
+        return verdict
+
+    def __matches_rules(self, text: str) -> bool:
+        return any(rx.search(text) for rx in self.COMPILED_RULES)
+
+    def __matches_entropy(self, text: str, threshold: float = ENTROPY_THRESHOLD) -> bool:
+        return any(self.__shannon_entropy(match) >= threshold for match in self.ENTROPY_CANDIDATE.findall(text))
+
+    def __explain(self, line: str) -> Dict[str, Any] | None:
+
+        hit = None
+        for (name, _), rx in zip(self.RULES, self.COMPILED_RULES):
+            m = rx.search(line)
+            if m:
+                hit = {"rule": name, "match": m.group(0)}
+                break
+
+        if hit is None:
+            for match in self.ENTROPY_CANDIDATE.findall(line):
+                if self.__shannon_entropy(match) >= self.ENTROPY_THRESHOLD:
+                    hit = {"rule": self.ENTROPY_RULE, "match": match}
                     break
 
-        return result
+        if hit is not None:
+            hit["entropy"] = round(self.__shannon_entropy(hit["match"]), 3)
+            hit["context"] = sorted(self.context_words(line))
+        return hit
 
     def __shannon_entropy(self, s: str) -> float:
 
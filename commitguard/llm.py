@@ -23,7 +23,7 @@ llm = ChatOpenAI(
     max_retries=2
 )
 
-Severity = Literal["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+Severity = Literal["OK", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
 
 
 class Finding(BaseModel):
@@ -51,8 +51,11 @@ prompt = ChatPromptTemplate.from_messages([
      "Severity:\n"
      "- HIGH: real secrets/credentials (API keys, tokens, passwords, private keys, AWS keys, GitHub tokens).\n"
      "- MEDIUM: risky configs or possible secrets (JWT-like strings, test tokens, --insecure, verify=False, disabling TLS checks).\n"
-     "- LOW: suspicious but likely non-exploitable (dummy/sample secrets, password variable names without real secret).\n\n"
+     "- LOW: suspicious but likely non-exploitable (dummy/sample secrets, password variable names without real secret).\n"
+     "- OK: no security risk.\n\n"
      "Output rules:\n"
+     "- Return exactly one finding per input line, use level OK for harmless lines.\n"
+     "- evidence is an exact snippet of that input line.\n"
      "- Return ONLY valid JSON.\n"
      "- JSON must strictly match the provided schema and types.\n"
      "- Do NOT include any extra keys, markdown, comments, or surrounding text.\n"
@@ -1,12 +1,125 @@
+import contextvars
+import json
 import logging, os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# structured fields every record carries when set, see log_context()
+LOG_FIELDS = ("run", "repo", "commit", "stage")
+_context: Dict[str, contextvars.ContextVar] = {name: contextvars.ContextVar(f"commitguard_{name}", default=None) for name in LOG_FIELDS}
+
+# COMMITGUARD_TRACE_REPO=owner/repo turns DEBUG on for that repository only
+_trace_repo = os.getenv("COMMITGUARD_TRACE_REPO") or None
+
+
+class ContextFilter(logging.Filter):
+    """Copies the run / repo / commit / stage context onto every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in _context.items():
+            setattr(record, name, var.get())
+        return True
+
+
+class TraceFilter(logging.Filter):
+    """With per-repository tracing the loggers run at DEBUG, records below the configured level only pass for the traced repository."""
+
+    def __init__(self, repo: str, level: int):
+        super().__init__()
+        self.repo = repo
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.level or getattr(record, "repo", None) == self.repo
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the context fields that are set."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in LOG_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                event[name] = value
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        return json.dumps(event, ensure_ascii=False)
+
+
+class LogSampler:
+    """Rate limit for per-line debug events: at most `limit` events of a kind per `window` seconds,
+    the number of dropped ones is reported when the window rolls over."""
+
+    def __init__(self, logger: logging.Logger, limit: int = 50, window: float = 1.0):
+        self.logger = logger
+        self.limit = limit
+        self.window = window
+        self.__windows: Dict[str, list] = {}
+        self.__lock = threading.Lock()
+
+    def allow(self, kind: str) -> bool:
+        now = time.monotonic()
+        with self.__lock:
+            window = self.__windows.setdefault(kind, [now, 0, 0])
+            if now - window[0] >= self.window:
+                if window[2]:
+                    self.logger.debug("%d %s event(s) dropped by sampling", window[2], kind)
+                window[:] = [now, 0, 0]
+
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
 
 def init_logging():
     level = os.getenv("LOG_LEVEL", "INFO").upper()
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(message)s"
-    )
+
+    handler = logging.StreamHandler()
+    handler.addFilter(ContextFilter())
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+
+    if _trace_repo:
+        handler.addFilter(TraceFilter(_trace_repo, logging.getLevelName(level)))
+        logging.getLogger("commitguard").setLevel(logging.DEBUG)
+
+    logging.basicConfig(level=level, handlers=[handler])
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
 def get_logger(name: str):
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
+
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    """Guard for hot paths, so per-line arguments are not even built when nobody reads them."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return _trace_repo is None or _context["repo"].get() == _trace_repo or logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
+@contextmanager
+def log_context(**fields):
+    tokens = [(_context[name], _context[name].set(value)) for name, value in fields.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def bind_log_context(**fields):
+    """Sets context fields for the rest of the current context (thread / task), e.g. the run id in main."""
+    for name, value in fields.items():
+        _context[name].set(value)
@@ -0,0 +1,197 @@
+import asyncio
+from typing import Any, Dict, List
+
+import requests
+
+from .baseline import Baseline
+from .cache import LRUCache
+from .checkpoint import Checkpoint
+from .core import assign_verdicts, scan_commit
+from .githubclient import GitHubClient
+from .leaks_parser import LeaksParser
+from .logging_config import get_logger, log_context
+from .triage import TriageScorer
+
+log = get_logger(__name__)
+
+
+class ScanPipeline:
+    """Fetch -> parse/scan -> classify as overlapping stages connected by bounded queues.
+
+    A commit is scanned as soon as its fetch completes and findings go to the LLM as soon as a batch fills up.
+    A full queue blocks the stage in front of it, so memory stays bounded by the queue sizes, not by the
+    number of commits.
+    """
+
+    DEFAULT_QUEUE_SIZE = 20
+    DEFAULT_LLM_BATCH_LINES = 50
+    DEFAULT_LLM_CONCURRENCY = 2
+    DEFAULT_SCAN_WORKERS = 2
+
+    def __init__(self, leaksparser: LeaksParser, baseline: Baseline | None = None, scorer: TriageScorer | None = None,
+                 classify=None, verdict_cache: LRUCache | None = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 llm_batch_lines: int = DEFAULT_LLM_BATCH_LINES, llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+                 scan_workers: int = DEFAULT_SCAN_WORKERS, checkpoint: Checkpoint | None = None):
+        self.leaksparser = leaksparser
+        self.baseline = baseline
+        self.scorer = scorer
+        self.classify = classify
+        self.verdict_cache = verdict_cache
+        self.queue_size = max(1, queue_size)
+        self.llm_batch_lines = max(1, llm_batch_lines)
+        self.scan_workers = max(1, scan_workers)
+        self.checkpoint = checkpoint
+        self.__llm_concurrency = max(1, llm_concurrency)
+        # shared by every run of the pipeline, parallel repositories do not multiply LLM calls in flight
+        self.__llm_slots: asyncio.Semaphore | None = None
+
+    #region PUBLIC methods
+    async def run(self, ghc: GitHubClient, number_of_commits: int, concurrency: int,
+                  ref: str | None = None) -> List[Dict[str, Any]]:
+
+        # stage tasks and their threads inherit the repository field of the log context
+        with log_context(repo=ghc.repo_name):
+            return await self.__run(ghc, number_of_commits, concurrency, ref)
+
+    async def run_many(self, clients: List[GitHubClient], number_of_commits: int, per_repo_concurrency: int,
+                       max_repos: int) -> List[Dict[str, Any]]:
+
+        repo_slots = asyncio.Semaphore(max_repos)
+
+        async def scan_one(ghc: GitHubClient) -> List[Dict[str, Any]]:
+            async with repo_slots:
+                log.info(f"Scanning {ghc.repo_name}")
+                try:
+                    records = await self.run(ghc, number_of_commits, per_repo_concurrency)
+                except (requests.RequestException, RuntimeError, SystemExit) as e:
+                    # one broken repository must not stop the whole sweep
+                    log.error(f"Scanning {ghc.repo_name} failed, skipping: {e}")
+                    return []
+
+            for record in records:
+                record["repo"] = ghc.repo_name
+            return records
+
+        results = await asyncio.gather(*(scan_one(ghc) for ghc in clients))
+        return [record for records in results for record in records]
+    #endregion
+
+    #region PRIVATE methods
+    async def __run(self, ghc: GitHubClient, number_of_commits: int, concurrency: int,
+                    ref: str | None) -> List[Dict[str, Any]]:
+
+        commit_hashes = await asyncio.to_thread(ghc.list_commits, number_of_commits, ref)
+        log.info(f"{ghc.repo_name}: pipelining {len(commit_hashes)} commit(s)")
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        if self.checkpoint is not None:
+            results = {commit_hash: self.checkpoint.findings(ghc.repo_name, commit_hash)
+                       for commit_hash in commit_hashes if self.checkpoint.is_scanned(ghc.repo_name, commit_hash)}
+            if results:
+                log.info(f"{ghc.repo_name}: {len(results)} commit(s) restored from checkpoint")
+        # findings restored without a verdict were waiting for the LLM when the previous run stopped
+        pending = [record for records in results.values() for record in records if "llm_response" not in record]
+
+        shas: asyncio.Queue = asyncio.Queue()
+        for commit_hash in commit_hashes:
+            if commit_hash not in results:
+                shas.put_nowait(commit_hash)
+        commits: asyncio.Queue = asyncio.Queue(self.queue_size)
+        findings: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                fetchers = [tg.create_task(self.__fetch_stage(ghc, shas, commits))
+                            for _ in range(max(1, min(concurrency, shas.qsize())))]
+                scanners = [tg.create_task(self.__scan_stage(ghc, commits, findings))
+                            for _ in range(self.scan_workers)]
+                tg.create_task(self.__classify_stage(findings, results, tg, pending))
+
+                # None tells the next stage that nothing more is coming
+                await asyncio.gather(*fetchers)
+                for _ in scanners:
+                    await commits.put(None)
+                await asyncio.gather(*scanners)
+                await findings.put(None)
+        except ExceptionGroup as eg:
+            # surface the stage failure the same way the sequential run would
+            raise eg.exceptions[0]
+
+        return [record for commit_hash in commit_hashes for record in results.get(commit_hash, [])]
+
+    async def __fetch_stage(self, ghc: GitHubClient, shas: asyncio.Queue, commits: asyncio.Queue):
+        while True:
+            try:
+                commit_hash = shas.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                with log_context(commit=commit_hash, stage="fetch"):
+                    data = await asyncio.to_thread(ghc.fetch_commit, commit_hash)
+            except SystemExit as e:
+                # the client exits on a failed fetch, raised from a task it would tear down the whole event loop
+                raise RuntimeError(f"Fetching {commit_hash} failed") from e
+
+            await commits.put((commit_hash, data))
+
+    async def __scan_stage(self, ghc: GitHubClient, commits: asyncio.Queue, findings: asyncio.Queue):
+        while True:
+            item = await commits.get()
+            if item is None:
+                return
+
+            commit_hash, data = item
+            with log_context(commit=commit_hash, stage="scan"):
+                records = await asyncio.to_thread(self.__scan, ghc, commit_hash, data)
+            if self.checkpoint is not None:
+                self.checkpoint.mark_scanned(ghc.repo_name, commit_hash, records)
+            await findings.put((commit_hash, records))
+
+    def __scan(self, ghc: GitHubClient, commit_hash: str, data: Dict) -> List[Dict[str, Any]]:
+        c_details = ghc.parse_commit_details(data)
+        return scan_commit(ghc, self.leaksparser, commit_hash, c_details, self.baseline)
+
+    async def __classify_stage(self, findings: asyncio.Queue, results: Dict[str, List[Dict[str, Any]]],
+                               tg: asyncio.TaskGroup, pending: List[Dict[str, Any]]):
+
+        if self.__llm_slots is None:
+            self.__llm_slots = asyncio.Semaphore(self.__llm_concurrency)
+
+        batch: List[Dict[str, Any]] = list(pending)
+
+        async def flush(records: List[Dict[str, Any]]):
+            # waiting for a slot here stops reading findings, the scanners block on the full queue behind us
+            await self.__llm_slots.acquire()
+            tg.create_task(self.__classify_batch(records))
+
+        while True:
+            item = await findings.get()
+            if item is None:
+                break
+
+            commit_hash, records = item
+            results[commit_hash] = records
+            batch.extend(records)
+            if len(batch) >= self.llm_batch_lines:
+                await flush(batch)
+                batch = []
+
+        # the task group waits for the batches still in flight
+        if batch:
+            await flush(batch)
+
+    async def __classify_batch(self, records: List[Dict[str, Any]]):
+        try:
+            with log_context(stage="classify"):
+                log.debug("LLM batch of %d finding(s) flushed", len(records))
+                try:
+                    await asyncio.to_thread(assign_verdicts, records, self.classify, self.verdict_cache, self.scorer)
+                except SystemExit as e:
+                    # run_llm exits on an LLM error, like a failed fetch it must not escape the task group
+                    raise RuntimeError(f"LLM classification of {len(records)} finding(s) failed") from e
+            if self.checkpoint is not None:
+                self.checkpoint.mark_classified(records)
+        finally:
+            self.__llm_slots.release()
+    #endregion
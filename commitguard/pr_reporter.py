@@ -0,0 +1,125 @@
+from typing import Any, Dict, List
+
+import requests
+
+from .githubclient import GITHUB_API_URL
+from .logging_config import get_logger
+
+log = get_logger(__name__)
+
+COMMENT_MARKER = "<!-- commitguard-report -->"
+CHECK_RUN_NAME = "CommitGuard"
+
+
+class PRReporter:
+    """Writes scan results to a PR: one sticky comment and a check run with per-line annotations."""
+
+    ANNOTATIONS_PER_REQUEST = 50
+    LEVELS = {"HIGH": "failure", "MEDIUM": "warning", "LOW": "notice"}
+
+    def __init__(self, session: requests.Session, repo: str, pr: str | int, token: str, api_url: str = GITHUB_API_URL):
+        self.__session = session
+        self.__api_url = api_url.rstrip("/")
+        self.__login: str | None = None
+        self.__repo_url = f"{api_url.rstrip('/')}/repos/{repo}"
+        self.__pr = pr
+        # the fetcher session authenticates with GH_PAT, writes go with the workflow token over the same pool
+        self.__headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    #region PUBLIC methods
+    def upsert_comment(self, body: str) -> int:
+        body = f"{COMMENT_MARKER}\n{body}"
+        comment_id = self.__find_comment()
+
+        if comment_id is None:
+            resp = self.__request("POST", f"{self.__repo_url}/issues/{self.__pr}/comments", {"body": body})
+            log.info("PR comment posted")
+            return resp.json()["id"]
+
+        self.__request("PATCH", f"{self.__repo_url}/issues/comments/{comment_id}", {"body": body})
+        log.info(f"PR comment {comment_id} updated")
+        return comment_id
+
+    def publish_check_run(self, head_sha: str, findings: List[Dict[str, Any]], summary: str) -> int:
+        # line numbers of a finding belong to the commit that produced it, only the head commit's match the head version
+        annotations = [a for a in (self.annotation(f) for f in findings if f.get("commit_sha") == head_sha) if a]
+        batches = [annotations[i:i + self.ANNOTATIONS_PER_REQUEST]
+                   for i in range(0, len(annotations), self.ANNOTATIONS_PER_REQUEST)] or [[]]
+
+        title = f"{len(findings)} suspicious line(s)" if findings else "Nothing suspicious found"
+        output = {"title": title, "summary": summary}
+
+        resp = self.__request("POST", f"{self.__repo_url}/check-runs", {
+            "name": CHECK_RUN_NAME,
+            "head_sha": head_sha,
+            "status": "completed",
+            "conclusion": "neutral" if findings else "success",
+            "output": {**output, "annotations": batches[0]},
+        })
+        check_run_id = resp.json()["id"]
+
+        # the API accepts 50 annotations per request, the following batches are appended to the same run
+        for batch in batches[1:]:
+            self.__request("PATCH", f"{self.__repo_url}/check-runs/{check_run_id}", {"output": {**output, "annotations": batch}})
+
+        log.info(f"Check run {check_run_id} published with {len(annotations)} annotation(s) in {len(batches)} request(s)")
+        return check_run_id
+
+    @classmethod
+    def annotation(cls, finding: Dict[str, Any]) -> Dict[str, Any] | None:
+        # annotations live on the head version of a file, deleted lines have nowhere to point to
+        if finding.get("side") == "deleted":
+            return None
+
+        path, _, line = finding["location"].rpartition(":")
+        if not path or not line.isdigit():
+            return None
+
+        verdict = finding.get("llm_response") or "Suspicious line"
+        level = verdict.split(":", 1)[0].strip().upper()
+        # judged a false positive, the comment still lists it
+        if level == "OK":
+            return None
+
+        return {
+            "path": path,
+            "start_line": int(line),
+            "end_line": int(line),
+            "annotation_level": cls.LEVELS.get(level, "warning"),
+            "title": finding.get("rule") or "CommitGuard",
+            "message": verdict,
+        }
+    #endregion
+
+    #region PRIVATE methods
+    def __find_comment(self) -> int | None:
+        page = 1
+        while True:
+            resp = self.__request("GET", f"{self.__repo_url}/issues/{self.__pr}/comments", params={"per_page": 100, "page": page})
+            comments = resp.json()
+            for comment in comments:
+                # anyone can paste the marker, only a comment of our own can be updated
+                if COMMENT_MARKER in (comment.get("body") or "") and self.__is_own(comment):
+                    return comment["id"]
+            if len(comments) < 100:
+                return None
+            page += 1
+
+    def __is_own(self, comment: Dict[str, Any]) -> bool:
+        user = comment.get("user") or {}
+        if self.__login is None:
+            try:
+                self.__login = self.__request("GET", f"{self.__api_url}/user").json()["login"]
+            except (requests.RequestException, KeyError, ValueError):
+                # installation tokens (the workflow GITHUB_TOKEN) cannot read /user, they comment as a bot
+                self.__login = ""
+        return user.get("login") == self.__login if self.__login else user.get("type") == "Bot"
+
+    def __request(self, method: str, url: str, payload: Dict | None = None, params: Dict | None = None) -> requests.Response:
+        resp = self.__session.request(method, url, json=payload, params=params, headers=self.__headers, timeout=20)
+        resp.raise_for_status()
+        return resp
+    #endregion
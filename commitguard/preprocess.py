@@ -0,0 +1,136 @@
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+NOTEBOOK_EXTENSIONS = {".ipynb"}
+
+# lines longer than this (minified bundles, inlined data) are split into overlapping windows,
+# the overlap keeps any token shorter than WINDOW_OVERLAP whole in at least one window
+MINIFIED_LINE_CHARS = 1000
+WINDOW_CHARS = 512
+WINDOW_OVERLAP = 128
+
+# inline payloads of minified text (data URIs, embedded base64 blobs) are dropped before windowing, each window
+# of them would otherwise be a high entropy finding of its own
+DATA_URI_PAYLOAD = re.compile(r"(data:[\w.+-]+/[\w.+-]+(?:;[\w=.-]+)*;base64,)[A-Za-z0-9+/=]+")
+BASE64_RUN = re.compile(r"[A-Za-z0-9+/=]{256,}")
+PAYLOAD_PLACEHOLDER = "<payload>"
+
+BINARY_MIME = re.compile(r"^(image|audio|video)/|^application/(pdf|octet-stream|vnd\.)")
+# a JSON object key, escaped quotes inside a string item (e.g. a dict literal in a source line) are not one
+JSON_KEY = re.compile(r'^"((?:[^"\\]|\\.)*)":\s')
+
+
+def is_notebook(filename: str) -> bool:
+    return Path(filename).suffix.lower() in NOTEBOOK_EXTENSIONS
+
+
+def window_line(text: str) -> List[str]:
+    if len(text) <= MINIFIED_LINE_CHARS:
+        return [text]
+
+    text = DATA_URI_PAYLOAD.sub(lambda m: m.group(1) + PAYLOAD_PLACEHOLDER, text)
+    text = BASE64_RUN.sub(PAYLOAD_PLACEHOLDER, text)
+    if len(text) <= MINIFIED_LINE_CHARS:
+        return [text]
+
+    step = WINDOW_CHARS - WINDOW_OVERLAP
+    return [text[i:i + WINDOW_CHARS] for i in range(0, len(text) - WINDOW_OVERLAP, step)]
+
+
+class NotebookLineFilter:
+    """Turns lines of an nbformat JSON file (or a diff of one) into scannable text:
+    string items of cells are decoded, binary outputs and JSON structure are dropped."""
+
+    def __init__(self):
+        self.__in_binary_list = False
+
+    def reset(self):
+        # a new hunk starts at an arbitrary point of the file, a binary list cut off by the previous one is over
+        self.__in_binary_list = False
+
+    def feed(self, line: str) -> str | None:
+        stripped = line.strip().rstrip(",")
+
+        if self.__in_binary_list:
+            if stripped.startswith("]"):
+                self.__in_binary_list = False
+            return None
+
+        if not stripped.startswith('"'):
+            return None
+
+        m = JSON_KEY.match(stripped)
+        if not m:
+            # a plain string item: a source line or a text output line
+            return self.__decode(stripped)
+
+        key, value = m.group(1), stripped[m.end():].lstrip()
+        if BINARY_MIME.match(key):
+            self.__in_binary_list = value == "["
+            return None
+
+        if value.startswith('"'):
+            decoded = self.__decode(value)
+            return decoded if key == "source" else stripped
+        return None
+
+    @staticmethod
+    def __decode(literal: str) -> str | None:
+        try:
+            text = json.loads(literal)
+        except ValueError:
+            return None
+        return text.rstrip("\n") if isinstance(text, str) else None
+
+
+class FilePreprocessor:
+    """Content type aware preprocessing of the lines of one file before they reach the scanner."""
+
+    def __init__(self, filename: str):
+        self.__notebook = NotebookLineFilter() if is_notebook(filename) else None
+
+    def process(self, text: str) -> List[str]:
+        if self.__notebook is not None:
+            text = self.__notebook.feed(text)
+            if text is None:
+                return []
+        return window_line(text)
+
+    def reset(self):
+        if self.__notebook is not None:
+            self.__notebook.reset()
+
+    def observe(self, text: str):
+        # diff context lines only move the notebook state forward
+        if self.__notebook is not None:
+            self.__notebook.feed(text)
+
+
+def notebook_cell_map(lines: Iterable[str]) -> Dict[int, Tuple[int, int]]:
+    """JSON line number -> (cell number, line in cell), 1-based, for the source lines of an nbformat file."""
+
+    mapping: Dict[int, Tuple[int, int]] = {}
+    cell = 0
+    in_source = False
+    source_line = 0
+
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+
+        if in_source:
+            if stripped.startswith("]"):
+                in_source = False
+            else:
+                source_line += 1
+                mapping[number] = (cell, source_line)
+        elif stripped.startswith('"cell_type":'):
+            cell += 1
+        elif stripped.startswith('"source":'):
+            source_line = 0
+            in_source = stripped.rstrip(",").endswith("[")
+            if not in_source:
+                mapping[number] = (cell, 1)
+
+    return mapping
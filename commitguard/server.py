@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Dict, List
+
+from .baseline import Baseline
+from .cache import LRUCache
+from .cassette import llm_from_env
+from .core import build_summary, severity_stats, write_pr_msg
+from .githubclient import GitHubClient, GITHUB_API_URL
+from .leaks_parser import LeaksParser
+from .pipeline import ScanPipeline
+from .triage import TriageScorer
+from .logging_config import get_logger, log_context
+
+log = get_logger(__name__)
+
+
+@dataclass
+class ScanJob:
+    repo: str
+    repo_url: str
+    pr_number: int
+    head_sha: str
+    commits: int
+
+
+class ScanServer:
+    """Long running webhook receiver, keeps HTTP pool, compiled rules and caches warm between PR scans."""
+
+    PR_ACTIONS = {"opened", "synchronize", "reopened", "ready_for_review"}
+    MAX_BODY_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, workers: int = 4, queue_size: int = 100,
+                 concurrency: int = 10, secret: str | None = None, api_url: str = GITHUB_API_URL,
+                 classify=None, token: str | None = None, baseline: Baseline | None = None, allow_unsigned: bool = False):
+        if not secret and not allow_unsigned:
+            raise ValueError("A webhook secret is required, unsigned webhooks are only accepted with allow_unsigned")
+
+        self.host = host
+        self.port = port
+        self.api_url = api_url
+        self.__workers = workers
+        self.__concurrency = concurrency
+        self.__secret = secret.encode() if secret else None
+        self.__token = token
+
+        self.__queue: asyncio.Queue | None = None
+        self.__queue_size = queue_size
+        self.__server: asyncio.Server | None = None
+        self.__tasks: List[asyncio.Task] = []
+
+        # state reused by every job
+        self.leaksparser = LeaksParser()
+        self.scorer = TriageScorer()
+        self.commit_cache = LRUCache(max_size=5000)
+        self.verdict_cache = LRUCache(max_size=20000)
+        self.__auth_client = GitHubClient("", api_url=api_url)
+        self.__fetch_slots = threading.BoundedSemaphore(concurrency)
+        self.pipeline = ScanPipeline(self.leaksparser, baseline, self.scorer, classify, self.verdict_cache)
+
+    #region PUBLIC methods
+    async def start(self):
+        if self.pipeline.classify is None:
+            # import langchain once at startup instead of on the first PR
+            from .llm import run_llm
+            self.pipeline.classify = run_llm
+
+        await asyncio.to_thread(self.__auth_client.authorize_github_api, self.__concurrency)
+
+        self.__queue = asyncio.Queue(maxsize=self.__queue_size)
+        self.__tasks = [asyncio.create_task(self.__worker(i)) for i in range(self.__workers)]
+        self.__server = await asyncio.start_server(self.__handle, self.host, self.port)
+        self.port = self.__server.sockets[0].getsockname()[1]
+
+        if not self.__secret:
+            log.warning("Accepting unsigned webhooks, anyone reaching this address can trigger scans and PR comments")
+        log.info(f"Serving webhooks on http://{self.host}:{self.port}/webhook ({self.__workers} worker(s))")
+
+    async def join(self):
+        await self.__queue.join()
+
+    async def stop(self):
+        self.__server.close()
+        await self.__server.wait_closed()
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.stop()
+
+    def submit(self, job: ScanJob) -> bool:
+        try:
+            self.__queue.put_nowait(job)
+        except asyncio.QueueFull:
+            log.warning(f"Queue is full, rejecting scan of {job.repo}#{job.pr_number}")
+            return False
+
+        log.info(f"Queued scan of {job.repo}#{job.pr_number} ({self.__queue.qsize()} job(s) waiting)")
+        return True
+    #endregion
+
+    #region PRIVATE methods
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status = await self.__dispatch(reader)
+        except (ValueError, KeyError, TypeError, AttributeError, asyncio.IncompleteReadError) as e:
+            # also malformed payloads, e.g. a pull_request event without "pull_request" / "head"
+            log.warning(f"Bad webhook request: {e}")
+            status = HTTPStatus.BAD_REQUEST
+
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def __dispatch(self, reader: asyncio.StreamReader) -> HTTPStatus:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, path, _ = request_line.split(" ", 2)
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if method == "GET" and path == "/healthz":
+            return HTTPStatus.OK
+
+        if method != "POST" or path != "/webhook":
+            return HTTPStatus.NOT_FOUND
+
+        length = int(headers.get("content-length", 0))
+        if length > self.MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        body = await reader.readexactly(length)
+
+        if self.__secret:
+            expected = "sha256=" + hmac.new(self.__secret, body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, headers.get("x-hub-signature-256", "")):
+                log.warning("Webhook signature mismatch, request rejected")
+                return HTTPStatus.UNAUTHORIZED
+
+        if headers.get("x-github-event") != "pull_request":
+            return HTTPStatus.NO_CONTENT
+
+        payload = json.loads(body)
+        if payload.get("action") not in self.PR_ACTIONS:
+            return HTTPStatus.NO_CONTENT
+
+        pr = payload["pull_request"]
+        repository = payload["repository"]
+        job = ScanJob(
+            repo=repository["full_name"],
+            repo_url=repository["html_url"],
+            pr_number=pr["number"],
+            head_sha=pr["head"]["sha"],
+            commits=max(1, min(pr.get("commits", 1), GitHubClient.MAX_COMMITS)),
+        )
+
+        return HTTPStatus.ACCEPTED if self.submit(job) else HTTPStatus.SERVICE_UNAVAILABLE
+
+    async def __worker(self, worker_id: int):
+        while True:
+            job = await self.__queue.get()
+            try:
+                # one run id per PR scan in JSON logs
+                with log_context(run=f"{job.repo}#{job.pr_number}@{job.head_sha[:7]}"):
+                    await self.__run_job(job)
+            except (Exception, SystemExit) as e:
+                log.error(f"Worker {worker_id}: scan of {job.repo}#{job.pr_number} failed: {e}")
+            finally:
+                self.__queue.task_done()
+
+    async def __run_job(self, job: ScanJob):
+        log.info(f"Scanning {job.repo}#{job.pr_number} at {job.head_sha[:7]}")
+
+        ghc = GitHubClient(
+            job.repo_url,
+            session=self.__auth_client.session,
+            fetch_slots=self.__fetch_slots,
+            budget=self.__auth_client.budget,
+            api_url=self.api_url,
+            commit_cache=self.commit_cache,
+        )
+
+        suspicious_commits = await self.pipeline.run(ghc, job.commits, self.__concurrency, ref=job.head_sha)
+
+        msg = ""
+        if suspicious_commits:
+            msg = build_summary(suspicious_commits, severity_stats(suspicious_commits))
+
+        await asyncio.to_thread(
+            write_pr_msg, msg, suspicious_commits, self.__auth_client.session,
+            job.repo, job.pr_number, self.__token, job.head_sha, self.api_url,
+        )
+        log.info(f"Finished {job.repo}#{job.pr_number}: {len(suspicious_commits)} suspicious line(s)")
+    #endregion
+
+
+def serve_main(argv: List[str]):
+    parser = argparse.ArgumentParser(prog="commitguard serve", description="Receive pull_request webhooks and scan PRs with warm caches")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=4, help="Scan jobs processed at the same time (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Max queued scan jobs before webhooks get 503 (default: 100)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Max in-flight GitHub requests, shared by all jobs (default: 10)")
+    parser.add_argument("--baseline", help="Baseline file with fingerprints of known findings to suppress")
+    parser.add_argument("--allow-unsigned", action="store_true",
+                        help="Accept webhooks without WEBHOOK_SECRET signature verification (local testing only)")
+    args = parser.parse_args(argv)
+
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret and not args.allow_unsigned:
+        log.error("Error there is no WEBHOOK_SECRET to verify webhook signatures with (pass --allow-unsigned to run without)")
+        sys.exit(1)
+
+    token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_PAT")
+    if not token:
+        log.error("Error there is no GITHUB_TOKEN (or GH_PAT) to post PR comments with")
+        sys.exit(1)
+
+    server = ScanServer(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        concurrency=args.concurrency,
+        secret=secret,
+        allow_unsigned=args.allow_unsigned,
+        token=token,
+        classify=llm_from_env(),
+        baseline=Baseline.load(args.baseline) if args.baseline else None,
+    )
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        log.info("Server stopped")
@@ -0,0 +1,13 @@
+import pytest
+
+from fake_github import FakeGitHub
+
+
+@pytest.fixture
+def github(mocker):
+    """A running FakeGitHub without commits, GitHub clients authorize with a dummy GH_PAT."""
+    mocker.patch("commitguard.githubclient.os.getenv", return_value="token")
+
+    fake = FakeGitHub().start()
+    yield fake
+    fake.stop()
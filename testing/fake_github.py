@@ -0,0 +1,275 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+
+class FakeGitHub:
+    """Local stand-in for the parts of the GitHub REST API CommitGuard talks to.
+
+    Besides plain responses it can add latency, inject errors, count down a rate limit and omit patches
+    (the file is then served from the contents API), which is enough to load test a full run offline.
+    """
+
+    MAX_PER_PAGE = 100
+
+    def __init__(self, latency=0.0, rate_limit=5000, reset_after=3600, error_rate=0.0, error_status=502, seed=0):
+        self.commits = {}
+        self.order = []
+        self.blobs = {}
+        self.comments = {}
+        self.check_runs = {}
+        self.requests = []
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.__random = random.Random(seed)
+        self.__failures = []
+        self.__binary = {}
+        self.__used = 0
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+
+    def add_commit(self, sha, message="commit", files=None, author="octocat"):
+        files = files or []
+        for f in files:
+            # a file with content and no patch is what GitHub returns for diffs too large to inline
+            if "content" in f:
+                self.blobs[(sha, f["filename"])] = f["content"]
+
+        self.commits[sha] = {
+            "sha": sha,
+            "commit": {"message": message, "author": {"name": author, "date": "2025-01-01T00:00:00Z"}},
+            "files": [{k: v for k, v in f.items() if k not in ("content", "binary")} for f in files],
+        }
+        self.order.insert(0, sha)
+        self.__binary[sha] = {f["filename"] for f in files if f.get("binary")}
+
+    def add_commits(self, count, files_for=None):
+        files_for = files_for or (lambda i: [{"filename": f"src/module_{i}.py", "status": "modified", "changes": 1,
+                                              "patch": f"@@ -1 +1 @@\n+value_{i} = compute({i})"}])
+        shas = [f"{i:040x}" for i in range(len(self.commits), len(self.commits) + count)]
+        for i, sha in enumerate(shas):
+            self.add_commit(sha, message=f"commit {i}", files=files_for(i))
+        return shas
+
+    def fail(self, path_suffix, status=None, times=1):
+        """The next `times` requests ending with path_suffix answer with status (default error_status)."""
+        with self.__lock:
+            self.__failures.append([path_suffix, status or self.error_status, times])
+
+    def count(self, path_suffix):
+        return sum(1 for method, path in self.requests if path.endswith(path_suffix))
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port=0):
+        self.__server = ThreadingHTTPServer(("127.0.0.1", port), self.__handler())
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def render_diff(self, sha):
+        """The commit as GitHub's unified diff media type, None when a patch was omitted (GitHub answers 406).
+        Files added with binary=True get git's binary section, a header without ---/+++ lines or hunks."""
+        sections = []
+        for f in self.commits[sha]["files"]:
+            name = f["filename"]
+            old_name = "/dev/null" if f.get("status") == "added" else f"a/{name}"
+            new_name = "/dev/null" if f.get("status") == "removed" else f"b/{name}"
+            if name in self.__binary[sha]:
+                sections.append(f"diff --git a/{name} b/{name}\nindex 1111111..2222222\n"
+                                f"Binary files {old_name} and {new_name} differ\n")
+                continue
+            if "patch" not in f:
+                return None
+            sections.append(f"diff --git a/{name} b/{name}\nindex 1111111..2222222 100644\n"
+                            f"--- {old_name}\n+++ {new_name}\n{f['patch']}\n")
+        return "".join(sections)
+
+    def next_failure(self, path):
+        with self.__lock:
+            for failure in self.__failures:
+                if path.endswith(failure[0]) and failure[2] > 0:
+                    failure[2] -= 1
+                    return failure[1]
+            if self.error_rate and self.__random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def spend_rate_limit(self):
+        with self.__lock:
+            self.__used += 1
+            return max(self.rate_limit - self.__used, 0), self.__used > self.rate_limit
+
+    def __handler(self):
+        fake = self
+        reset_at = int(time.time()) + self.reset_after
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, payload=None, raw=None, headers=None):
+                body = raw if raw is not None else (json.dumps(payload).encode() if payload is not None else b"")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain" if raw is not None else "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-RateLimit-Limit", str(fake.rate_limit))
+                self.send_header("X-RateLimit-Remaining", str(self.remaining))
+                self.send_header("X-RateLimit-Reset", str(reset_at))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def intercept(self, method):
+                url = urlparse(self.path)
+                fake.requests.append((method, url.path))
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                self.remaining, exceeded = fake.spend_rate_limit()
+                if exceeded:
+                    self.reply(403, {"message": "API rate limit exceeded"})
+                    return url, True
+
+                status = fake.next_failure(url.path)
+                if status:
+                    self.reply(status, {"message": "Injected error"})
+                    return url, True
+
+                return url, False
+
+            def do_GET(self):
+                url, handled = self.intercept("GET")
+                if handled:
+                    return
+
+                if url.path == "/user":
+                    return self.reply(200, {"login": "octocat"})
+
+                if re.fullmatch(r"/repos/[^/]+/[^/]+/commits", url.path):
+                    query = parse_qs(url.query)
+                    per_page = min(int(query.get("per_page", ["30"])[0]), fake.MAX_PER_PAGE)
+                    page = int(query.get("page", ["1"])[0])
+                    shas = fake.order[(page - 1) * per_page:page * per_page]
+
+                    headers = {}
+                    if page * per_page < len(fake.order):
+                        headers["Link"] = f'<{fake.url}{url.path}?per_page={per_page}&page={page + 1}>; rel="next"'
+                    items = [{"sha": sha, "commit": fake.commits[sha]["commit"]} if sha in fake.commits else {"sha": sha}
+                             for sha in shas]
+                    return self.reply(200, items, headers=headers)
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/commits/(\w+)", url.path)
+                if m and m.group(1) in fake.commits:
+                    if self.headers.get("Accept") == "application/vnd.github.diff":
+                        diff = fake.render_diff(m.group(1))
+                        if diff is None:
+                            return self.reply(406, {"message": "Sorry, this diff is too large to render"})
+                        return self.reply(200, raw=diff.encode())
+                    return self.reply(200, fake.commits[m.group(1)])
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/contents/(.+)", url.path)
+                if m:
+                    ref = parse_qs(url.query).get("ref", [""])[0]
+                    content = fake.blobs.get((ref, unquote(m.group(1))))
+                    if content is not None:
+                        return self.reply(200, raw=content.encode())
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/issues/(\d+)/comments", url.path)
+                if m:
+                    comments = [c for c in fake.comments.values() if c["issue"] == int(m.group(1))]
+                    return self.reply(200, comments)
+
+                self.reply(404, {"message": "Not Found"})
+
+            def read_json(self):
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def do_POST(self):
+                body = self.read_json()
+                url, handled = self.intercept("POST")
+                if handled:
+                    return
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/issues/(\d+)/comments", url.path)
+                if m:
+                    comment_id = len(fake.comments) + 1
+                    fake.comments[comment_id] = {"id": comment_id, "issue": int(m.group(1)), "body": body.get("body", ""),
+                                                 "user": {"login": "octocat", "type": "User"}}
+                    return self.reply(201, fake.comments[comment_id])
+
+                if re.fullmatch(r"/repos/[^/]+/[^/]+/check-runs", url.path):
+                    run_id = len(fake.check_runs) + 1
+                    fake.check_runs[run_id] = {**body, "id": run_id, "annotations": list(body["output"].get("annotations", []))}
+                    return self.reply(201, fake.check_runs[run_id])
+
+                self.reply(404, {"message": "Not Found"})
+
+            def do_PATCH(self):
+                body = self.read_json()
+                url, handled = self.intercept("PATCH")
+                if handled:
+                    return
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/issues/comments/(\d+)", url.path)
+                if m and int(m.group(1)) in fake.comments:
+                    if fake.comments[int(m.group(1))]["user"]["login"] != "octocat":
+                        return self.reply(403, {"message": "Resource not accessible by integration"})
+                    fake.comments[int(m.group(1))]["body"] = body.get("body", "")
+                    return self.reply(200, fake.comments[int(m.group(1))])
+
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/check-runs/(\d+)", url.path)
+                if m and int(m.group(1)) in fake.check_runs:
+                    fake.check_runs[int(m.group(1))]["annotations"].extend(body["output"].get("annotations", []))
+                    return self.reply(200, fake.check_runs[int(m.group(1))])
+
+                self.reply(404, {"message": "Not Found"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # standalone server for load testing the CLI:
+    #   python testing/fake_github.py --commits 2000 --latency 0.05 --port 8000
+    #   GITHUB_API_URL=http://127.0.0.1:8000 GH_PAT=x COMMITGUARD_LLM=stub commitguard --repo https://github.com/o/r --n 2000 --nofile
+    parser = argparse.ArgumentParser(description="Fake GitHub API for offline load tests")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--commits", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 502")
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--leak-every", type=int, default=10, help="Every n-th commit adds a secret-like line")
+    args = parser.parse_args()
+
+    def files_for(i):
+        line = f"token = 'k8sProd{i}Value42'" if i % args.leak_every == 0 else f"value_{i} = compute({i})"
+        return [{"filename": f"src/module_{i}.py", "status": "modified", "changes": 1, "patch": f"@@ -1 +1 @@\n+{line}"}]
+
+    fake = FakeGitHub(latency=args.latency, rate_limit=args.rate_limit, error_rate=args.error_rate)
+    fake.add_commits(args.commits, files_for)
+    fake.start(args.port)
+    print(f"Fake GitHub API with {args.commits} commit(s) on {fake.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
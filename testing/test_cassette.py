@@ -0,0 +1,71 @@
+import pytest
+
+from commitguard.cassette import CassetteMiss, StubLLM, cassette_from_env, llm_from_env
+from commitguard.githubclient import GitHubClient
+from commitguard.leaks_parser import LeaksParser
+from commitguard.pipeline import ScanPipeline
+from fake_github import FakeGitHub
+
+
+def files_for(i):
+    line = f"token = 'k8sProd{i}Value42'" if i % 2 == 0 else f"value_{i} = compute({i})"
+    return [{"filename": f"src/module_{i}.py", "status": "modified", "changes": 1, "patch": f"@@ -1 +1 @@\n+{line}"}]
+
+
+async def scan(api_url, classify):
+    ghc = GitHubClient("https://github.com/owner/repo", api_url=api_url)
+    ghc.authorize_github_api()
+    return await ScanPipeline(LeaksParser(), classify=classify, llm_batch_lines=2).run(ghc, 6, concurrency=3)
+
+
+@pytest.fixture
+def cassette_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("GH_PAT", "token")
+    monkeypatch.setenv("COMMITGUARD_CASSETTE", str(tmp_path / "cassette.json"))
+
+    def use(mode):
+        monkeypatch.setenv("COMMITGUARD_CASSETTE_MODE", mode)
+        return cassette_from_env()
+    return use
+
+
+@pytest.mark.asyncio
+async def test_recorded_run_replays_offline(cassette_env, monkeypatch):
+    monkeypatch.setenv("COMMITGUARD_LLM", "stub")
+    fake = FakeGitHub().start()
+    fake.add_commits(6, files_for)
+
+    cassette = cassette_env("record")
+    recorded = await scan(fake.url, llm_from_env())
+    cassette.save()
+    fake.stop()
+
+    cassette_env("replay")
+    # nothing listens there anymore, every response and verdict comes from the cassette
+    replayed = await scan(fake.url, llm_from_env())
+
+    assert len(recorded) == 3
+    assert [(r["location"], r["llm_response"]) for r in replayed] == [(r["location"], r["llm_response"]) for r in recorded]
+
+
+@pytest.mark.asyncio
+async def test_replay_fails_on_unrecorded_request(cassette_env):
+    fake = FakeGitHub().start()
+    fake.add_commits(6, files_for)
+    cassette = cassette_env("record")
+    ghc = GitHubClient("https://github.com/owner/repo", api_url=fake.url)
+    ghc.authorize_github_api()
+    cassette.save()
+    fake.stop()
+
+    cassette_env("replay")
+    with pytest.raises(CassetteMiss):
+        await scan(fake.url, StubLLM())
+
+
+def test_stub_llm_answers_in_chain_format():
+    stub = StubLLM(level="HIGH")
+
+    assert stub(["a = 1", " "]) == "HIGH: stubbed verdict - a = 1"
+    assert stub([]) == "ok"
+    assert stub.calls == 2
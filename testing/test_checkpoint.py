@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from commitguard.checkpoint import Checkpoint
+from commitguard.githubclient import GitHubClient
+from commitguard.leaks_parser import LeaksParser
+from commitguard.pipeline import ScanPipeline
+
+
+def files_for(i):
+    return [{"filename": f"src/module_{i}.py", "status": "modified", "changes": 1,
+             "patch": f"@@ -1 +1 @@\n+token = 'k8sProd{i}Value42'"}]
+
+
+@pytest.fixture
+def github(github):
+    github.add_commits(4, files_for)
+    return github
+
+
+async def scan(fake, checkpoint, classify):
+    ghc = GitHubClient("https://github.com/owner/repo", api_url=fake.url)
+    ghc.authorize_github_api()
+    pipeline = ScanPipeline(LeaksParser(), classify=classify, llm_batch_lines=100, checkpoint=checkpoint)
+    try:
+        return await pipeline.run(ghc, 4, concurrency=2)
+    finally:
+        checkpoint.save()
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_scanned_commits_and_classifies_pending_findings(github, tmp_path):
+    state = str(tmp_path / "state.json")
+
+    def broken_llm(texts):
+        raise RuntimeError("LLM timed out")
+
+    with pytest.raises(RuntimeError):
+        await scan(github, Checkpoint(state, interval=0), broken_llm)
+
+    saved = json.load(open(state))["repos"]["owner/repo"]
+    assert len(saved) == 4
+    assert all("llm_response" not in r for records in saved.values() for r in records)
+
+    calls = []
+
+    def classify(texts):
+        calls.append(texts)
+        return "\n".join(f"HIGH: token - {t.strip()}" for t in texts)
+
+    records = await scan(github, Checkpoint.load(state, interval=0), classify)
+
+    assert len(records) == 4
+    assert all(r["llm_response"].startswith("HIGH") for r in records)
+    assert sum(github.count(f"/commits/{sha}") for sha in github.order) == 4
+    assert len(calls) == 1 and len(calls[0]) == 4
+    assert Checkpoint.load(state).pending() == []
+
+
+def test_checkpoint_is_written_atomically(tmp_path):
+    state = tmp_path / "state.json"
+    checkpoint = Checkpoint(str(state), interval=3600)
+
+    records = [{"line": "x", "location": "a.py:1"}]
+    checkpoint.mark_scanned("owner/repo", "abc", records)
+    assert not state.exists()
+
+    checkpoint.save()
+    records[0]["llm_response"] = "LOW: x"
+    checkpoint.mark_classified(records)
+    checkpoint.save()
+
+    restored = Checkpoint.load(str(state))
+    assert restored.is_scanned("owner/repo", "abc")
+    assert restored.findings("owner/repo", "abc")[0]["llm_response"] == "LOW: x"
+    assert not (tmp_path / "state.json.tmp").exists()
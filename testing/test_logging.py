@@ -0,0 +1,32 @@
+import json
+import logging
+
+from commitguard.logging_config import JsonFormatter, LogSampler, log_context, ContextFilter
+
+
+def make_record(msg, *args, level=logging.INFO):
+    record = logging.LogRecord("commitguard.test", level, __file__, 1, msg, args, None)
+    ContextFilter().filter(record)
+    return record
+
+
+def test_json_formatter_carries_context_fields():
+    with log_context(run="r1", repo="owner/repo"):
+        with log_context(commit="abc123", stage="scan"):
+            inner = make_record("scanned %d line(s)", 3)
+        outer = make_record("done")
+
+    event = json.loads(JsonFormatter().format(inner))
+    assert event["msg"] == "scanned 3 line(s)"
+    assert (event["run"], event["repo"], event["commit"], event["stage"]) == ("r1", "owner/repo", "abc123", "scan")
+
+    event = json.loads(JsonFormatter().format(outer))
+    assert "commit" not in event and event["repo"] == "owner/repo"
+    assert "repo" not in json.loads(JsonFormatter().format(make_record("after")))
+
+
+def test_sampler_limits_events_per_window(caplog):
+    sampler = LogSampler(logging.getLogger("commitguard.test"), limit=3, window=3600)
+
+    assert [sampler.allow("line") for _ in range(5)] == [True, True, True, False, False]
+    assert sampler.allow("other")
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from commitguard.cache import LRUCache
+from commitguard.core import UNCLASSIFIED_VERDICT, assign_verdicts
+from commitguard.githubclient import GitHubClient
+from commitguard.leaks_parser import LeaksParser
+from commitguard.pipeline import ScanPipeline
+from fake_github import FakeGitHub
+
+
+def leak(value):
+    return [{"filename": "app.py", "status": "modified", "changes": 1, "patch": f"@@ -1 +1 @@\n+token = '{value}'"}]
+
+
+@pytest.fixture
+def github(github):
+    for i in range(4):
+        github.add_commit(f"sha{i}", files=leak(f"k8sProd{i}Value42"))
+    return github
+
+
+def client(fake, name="owner/repo"):
+    ghc = GitHubClient(f"https://github.com/{name}", api_url=fake.url)
+    ghc.authorize_github_api()
+    return ghc
+
+
+def verdicts(calls):
+    def classify(texts):
+        calls.append(list(texts))
+        return "\n".join(f"MEDIUM: hardcoded password - {t.strip()}" for t in texts)
+    return classify
+
+
+@pytest.mark.asyncio
+async def test_pipeline_keeps_commit_order_and_flushes_batches(github):
+    calls = []
+    pipeline = ScanPipeline(LeaksParser(), classify=verdicts(calls), llm_batch_lines=2, queue_size=1)
+
+    records = await pipeline.run(client(github), 4, concurrency=3)
+
+    assert [r["commit_sha"] for r in records] == ["sha3", "sha2", "sha1", "sha0"]
+    assert all(r["llm_response"].startswith("MEDIUM") for r in records)
+    assert sorted(len(texts) for texts in calls) == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_classifies_before_fetching_is_done(github):
+    first_batch = threading.Event()
+
+    def classify(texts):
+        first_batch.set()
+        return "OK"
+
+    ghc = client(github)
+    fetch_commit = ghc.fetch_commit
+
+    def slow_fetch(commit_hash):
+        # the oldest commit is only fetched once the LLM has seen the first findings
+        if commit_hash == "sha0":
+            assert first_batch.wait(timeout=5)
+        return fetch_commit(commit_hash)
+
+    ghc.fetch_commit = slow_fetch
+    pipeline = ScanPipeline(LeaksParser(), classify=classify, llm_batch_lines=1)
+
+    records = await pipeline.run(ghc, 4, concurrency=1)
+
+    assert len(records) == 4
+
+
+@pytest.mark.asyncio
+async def test_run_many_skips_broken_repository(github):
+    github.order.insert(0, "missing")
+    calls = []
+    pipeline = ScanPipeline(LeaksParser(), classify=verdicts(calls))
+
+    with pytest.raises(RuntimeError):
+        await pipeline.run(client(github), 5, concurrency=2)
+
+    github.order.remove("missing")
+    records = await pipeline.run_many([client(github, "owner/a"), client(github, "owner/b")], 4, 2, 2)
+
+    assert {r["repo"] for r in records} == {"owner/a", "owner/b"}
+    assert len(records) == 8
+
+
+@pytest.mark.asyncio
+async def test_pipeline_load_1000_commits(mocker):
+    mocker.patch("commitguard.githubclient.os.getenv", return_value="token")
+
+    def files_for(i):
+        line = f"token = 'k8sProd{i}Value42'" if i % 10 == 0 else f"value_{i} = compute({i})"
+        return [{"filename": f"src/module_{i}.py", "status": "modified", "changes": 1, "patch": f"@@ -1 +1 @@\n+{line}"}]
+
+    fake = FakeGitHub(latency=0.001).start()
+    fake.add_commits(1000, files_for)
+    calls = []
+    try:
+        records = await ScanPipeline(LeaksParser(), classify=verdicts(calls)).run(client(fake), 1000, concurrency=20)
+    finally:
+        fake.stop()
+
+    assert len(records) == 100
+    assert fake.count("/commits") == 10
+    assert sum(len(texts) for texts in calls) == 100
+    assert len(fake.requests) == 1 + 10 + 1000
+
+
+@pytest.mark.asyncio
+async def test_pipeline_turns_llm_exit_into_runtime_error(github):
+    def classify(texts):
+        raise SystemExit(1)
+
+    with pytest.raises(RuntimeError):
+        await ScanPipeline(LeaksParser(), classify=classify).run(client(github), 4, concurrency=2)
+
+
+def test_lines_without_llm_verdict_are_not_cleared():
+    cache = LRUCache(max_size=10)
+    findings = [{"line": "token = 'k8sProdValue42'"}, {"line": "api_key = 'k8sStageValue42'"}]
+
+    # a cut off answer: the second line is missing, a bare "ok" must not match "token"
+    assign_verdicts(findings, lambda texts: "HIGH: hardcoded token - token = 'k8sProdValue42'\nok", cache)
+
+    assert findings[0]["llm_response"] == "HIGH: hardcoded token - token = 'k8sProdValue42'"
+    assert findings[1]["llm_response"] == UNCLASSIFIED_VERDICT
+    assert cache.get("api_key = 'k8sStageValue42'") is None
@@ -0,0 +1,66 @@
+import requests
+
+from commitguard.pr_reporter import COMMENT_MARKER, PRReporter
+
+
+def make_reporter(github):
+    return PRReporter(requests.Session(), "owner/repo", 3, "token", api_url=github.url)
+
+
+def test_comment_is_created_once_then_updated(github):
+    reporter = make_reporter(github)
+
+    first = reporter.upsert_comment("first run")
+    second = reporter.upsert_comment("second run")
+
+    assert first == second
+    assert list(github.comments) == [1]
+    assert github.comments[1]["body"] == f"{COMMENT_MARKER}\nsecond run"
+    assert github.count("/issues/3/comments") == 3
+
+
+def test_annotations_are_sent_in_batches_of_50(github):
+    findings = [
+        {"location": f"app.py:{i}", "side": "added", "rule": "JWT", "llm_response": "HIGH: token - x", "commit_sha": "abc123"}
+        for i in range(1, 121)
+    ]
+    findings.append({"location": "old.py:3", "side": "deleted", "rule": "JWT", "llm_response": "LOW: x", "commit_sha": "abc123"})
+
+    make_reporter(github).publish_check_run("abc123", findings, "summary")
+
+    run = github.check_runs[1]
+    assert run["conclusion"] == "neutral"
+    assert len(run["annotations"]) == 120
+    assert run["annotations"][0] == {
+        "path": "app.py", "start_line": 1, "end_line": 1, "annotation_level": "failure",
+        "title": "JWT", "message": "HIGH: token - x",
+    }
+    assert github.count("/check-runs") == 1
+    assert github.count("/check-runs/1") == 2
+
+
+def test_only_head_commit_findings_that_are_not_ok_are_annotated(github):
+    findings = [
+        {"location": "app.py:4", "side": "added", "rule": "JWT", "llm_response": "HIGH: token - x", "commit_sha": "head"},
+        {"location": "app.py:9", "side": "added", "rule": "JWT", "llm_response": "OK", "commit_sha": "head"},
+        {"location": "app.py:2", "side": "added", "rule": "JWT", "llm_response": "HIGH: token - y", "commit_sha": "older"},
+    ]
+
+    make_reporter(github).publish_check_run("head", findings, "summary")
+
+    run = github.check_runs[1]
+    assert [(a["path"], a["start_line"]) for a in run["annotations"]] == [("app.py", 4)]
+    assert run["output"]["title"] == "3 suspicious line(s)"
+
+
+def test_marker_in_foreign_comment_is_not_taken_over(github):
+    github.comments[1] = {"id": 1, "issue": 3, "body": f"quoting the bot: {COMMENT_MARKER}",
+                          "user": {"login": "mallory", "type": "User"}}
+    reporter = make_reporter(github)
+
+    own = reporter.upsert_comment("first run")
+    assert reporter.upsert_comment("second run") == own
+
+    assert own != 1
+    assert github.comments[1]["body"] == f"quoting the bot: {COMMENT_MARKER}"
+    assert github.comments[own]["body"] == f"{COMMENT_MARKER}\nsecond run"
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from commitguard.server import ScanServer, serve_main
+
+
+SECRET = "webhook-secret"
+
+
+def pr_event(action="synchronize", number=7, commits=2):
+    return {
+        "action": action,
+        "repository": {"full_name": "owner/repo", "html_url": "https://github.com/owner/repo"},
+        "pull_request": {"number": number, "commits": commits, "head": {"sha": "bbb222"}},
+    }
+
+
+async def post_webhook(port, payload, event="pull_request", secret=SECRET):
+    body = json.dumps(payload).encode()
+    signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"POST /webhook HTTP/1.1\r\nHost: localhost\r\nX-GitHub-Event: {event}\r\n"
+        f"X-Hub-Signature-256: {signature}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+@pytest.fixture
+def github(github):
+    github.add_commit("aaa111", files=[{"filename": "app.py", "status": "modified", "changes": 1,
+                                        "patch": "@@ -1 +1 @@\n+token = 'k8sProdValue42'"}])
+    github.add_commit("bbb222", files=[{"filename": "README.md", "status": "modified", "changes": 1,
+                                        "patch": "@@ -1 +1 @@\n+hello"}])
+    return github
+
+
+@pytest.mark.asyncio
+async def test_serve_scans_pr_and_reuses_caches(github):
+    calls = []
+
+    def classify(texts):
+        calls.append(texts)
+        return "\n".join(f"HIGH: hardcoded token - {t.strip()}" for t in texts)
+
+    server = ScanServer(port=0, workers=2, secret=SECRET, api_url=github.url, classify=classify, token="t")
+    await server.start()
+    try:
+        assert await post_webhook(server.port, pr_event()) == 202
+        await server.join()
+        assert await post_webhook(server.port, pr_event()) == 202
+        await server.join()
+    finally:
+        await server.stop()
+
+    # one authorization for both jobs, plus the reporter looking up its login before updating its comment
+    assert github.count("/user") == 2
+    assert github.count("/commits/aaa111") == 1
+    assert len(calls) == 1
+    assert list(github.comments) == [1]
+    assert github.comments[1]["issue"] == 7
+    assert "Suspicious lines found:** `1`" in github.comments[1]["body"]
+    assert [run["head_sha"] for run in github.check_runs.values()] == ["bbb222", "bbb222"]
+    # the finding comes from aaa111, its line numbers do not point into the head version
+    assert github.check_runs[2]["annotations"] == []
+
+
+@pytest.mark.asyncio
+async def test_serve_rejects_bad_signature_and_ignores_other_events(github):
+    server = ScanServer(port=0, secret=SECRET, api_url=github.url, classify=lambda texts: "ok", token="t")
+    await server.start()
+    try:
+        assert await post_webhook(server.port, pr_event(), secret="wrong") == 401
+        assert await post_webhook(server.port, pr_event(), event="push") == 204
+        assert await post_webhook(server.port, pr_event(action="closed")) == 204
+    finally:
+        await server.stop()
+
+    assert github.count("/commits") == 0
+
+
+@pytest.mark.asyncio
+async def test_serve_survives_llm_exit(github):
+    calls = []
+
+    def classify(texts):
+        calls.append(texts)
+        raise SystemExit(1)
+
+    server = ScanServer(port=0, secret=SECRET, api_url=github.url, classify=classify, token="t")
+    await server.start()
+    try:
+        assert await post_webhook(server.port, pr_event()) == 202
+        await server.join()
+        assert await post_webhook(server.port, pr_event()) == 202
+        await server.join()
+    finally:
+        await server.stop()
+
+    assert len(calls) == 2
+    assert github.comments == {}
+
+
+@pytest.mark.asyncio
+async def test_serve_answers_400_to_malformed_payloads(github):
+    server = ScanServer(port=0, secret=SECRET, api_url=github.url, classify=lambda texts: "ok", token="t")
+    await server.start()
+    try:
+        assert await post_webhook(server.port, {"action": "opened"}) == 400
+        assert await post_webhook(server.port, {"action": "opened", "repository": {}, "pull_request": None}) == 400
+        assert await post_webhook(server.port, ["opened"]) == 400
+        assert await post_webhook(server.port, pr_event()) == 202
+        await server.join()
+    finally:
+        await server.stop()
+
+
+def test_serve_requires_a_secret_unless_opted_out(mocker):
+    with pytest.raises(ValueError):
+        ScanServer(port=0, token="t")
+    assert ScanServer(port=0, token="t", allow_unsigned=True)
+
+    mocker.patch.dict("os.environ", {"GITHUB_TOKEN": "t"}, clear=True)
+    with pytest.raises(SystemExit):
+        serve_main([])